@@ -4,16 +4,15 @@ import numpy as np
 from alpaca.trading.client import TradingClient
 from alpaca.trading.requests import MarketOrderRequest, LimitOrderRequest
 from alpaca.trading.enums import OrderSide, TimeInForce
-from alpaca.data.historical import StockHistoricalDataClient
+from alpaca_cache import CachedStockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import pandas_ta as ta
 import time
 
 # Import our verified indicators
-from indicators import calculate_alphatrend
+from indicators import calculate_alphatrend, calculate_indicator_bundle
 from visualizer import generate_trade_card
 
 class ActiveAlphaTrader:
@@ -24,7 +23,7 @@ class ActiveAlphaTrader:
         
         # Explicitly setting paper=True for safety
         self.trading_client = TradingClient(self.api_key, self.secret_key, paper=True)
-        self.data_client = StockHistoricalDataClient(self.api_key, self.secret_key)
+        self.data_client = CachedStockHistoricalDataClient(self.api_key, self.secret_key)
         
         self.watchlist = ["NVDA", "TSLA", "AMD", "META", "NFLX", "AMZN", "MSFT", "GOOGL", "AVGO", "SMCI", "ARM", "PLTR", "QCOM", "AAPL"]
         self.log_file = "stock-bot/data/paper_trade_log.csv"
@@ -55,10 +54,10 @@ class ActiveAlphaTrader:
                     
                     if len(df) < 200: continue
                     
-                    df['Sma200'] = df['Close'].rolling(200).mean()
-                    df = calculate_alphatrend(df)
-                    df['rsi'] = ta.rsi(df['Close'], length=14)
-                    df['atr'] = ta.atr(df['High'], df['Low'], df['Close'], length=14)
+                    bundle = calculate_indicator_bundle(df)
+                    df = calculate_alphatrend(df, bundle=bundle)
+                    df['Sma200'] = bundle['sma200']
+                    df['atr'] = bundle['atr']
                     
                     last = df.iloc[-1]
                     prev = df.iloc[-2]
@@ -1,15 +1,15 @@
 import pandas as pd
 import numpy as np
-import vectorbt as vbt
-from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import os
-import time
+from indicators import calculate_indicator_bundle
 from rsi_alpha import find_bullish_divergence
 from trend_alpha import calculate_trend_quality
+import sync_data
+from universe import store_universe
 
 # Load credentials
 load_dotenv("stock-bot/.env")
@@ -20,8 +20,6 @@ if not API_KEY:
     print("Error: Alpaca API Key missing in .env")
     exit(1)
 
-client = StockHistoricalDataClient(API_KEY, SECRET_KEY)
-
 def get_expanded_tickers():
     """Reads the full universe from the expanded watchlist."""
     try:
@@ -38,45 +36,52 @@ def screen_weekly_candidates(tickers):
     # Need 200+ days for SMA 200
     start_dt = end_dt - timedelta(days=365)
 
+    # Bad symbols are bisected out of their batch and quarantined instead of dropping the other 99
+    sync_data.init_db()
+    tickers, rechecks = sync_data.screen_quarantined(tickers)
+    bucket = sync_data.TokenBucket(sync_data.RATE_LIMIT_PER_MIN / 60, capacity=1)
+    rejected, fetched_ok = [], set()
+
+    def make_request(symbols):
+        return StockBarsRequest(
+            symbol_or_symbols=symbols,
+            timeframe=TimeFrame.Day,
+            start=start_dt,
+            end=end_dt,
+            adjustment='all'
+        )
+
     print(f"--- Weekly Alpha Scan: {len(tickers)} tickers ---")
 
     batch_size = 100 # Alpaca handles 100 well
-    for i in range(0, len(tickers), batch_size):
-        batch = tickers[i:i + batch_size]
-        print(f"Scanning batch {i//batch_size + 1}/{len(tickers)//batch_size + 1}...")
+    # Quarantined symbols due a re-check go in batches of their own, which may be rejected whole
+    regular = [t for t in tickers if t not in rechecks]
+    batches = [(regular[i:i + batch_size], False) for i in range(0, len(regular), batch_size)]
+    batches += [(rechecks[i:i + batch_size], True) for i in range(0, len(rechecks), batch_size)]
+    for n, (batch, rechecking) in enumerate(batches, 1):
+        print(f"Scanning batch {n}/{len(batches)}...")
         
         try:
-            request_params = StockBarsRequest(
-                symbol_or_symbols=batch,
-                timeframe=TimeFrame.Day,
-                start=start_dt,
-                end=end_dt,
-                adjustment='all'
-            )
-            
-            bars_response = client.get_stock_bars(request_params)
-            bars_df = bars_response.df
-            
-            if bars_df.empty:
-                continue
+            frames = sync_data.bars_to_frames(sync_data.fetch_batch(batch, make_request, bucket, rejected, rechecking))
+            fetched_ok.update(batch)
 
             for symbol in batch:
-                if symbol not in bars_df.index.get_level_values(0):
+                if symbol not in frames:
                     continue
                 
-                df = bars_df.xs(symbol).copy()
-                df.columns = [col.capitalize() for col in df.columns]
+                df = frames[symbol]
                 if len(df) < 200: continue
                 
                 close = df['Close']
                 price = close.iloc[-1]
+                bundle = calculate_indicator_bundle(df)
                 
                 # 1. Primary Filter: Macro Uptrend (SMA 200)
-                sma200 = vbt.MA.run(close, window=200).ma.iloc[-1]
+                sma200 = bundle['sma200'].iloc[-1]
                 if price <= sma200: continue
 
                 # 2. Secondary Filter: Not excessively overbought on weekly/daily scale
-                rsi_series = vbt.RSI.run(close, window=14).rsi
+                rsi_series = bundle['rsi']
                 rsi = rsi_series.iloc[-1]
                 if rsi > 75: continue # Skip the blow-off tops
 
@@ -91,7 +96,7 @@ def screen_weekly_candidates(tickers):
                 has_divergence = find_bullish_divergence(close, rsi_series)
                 
                 # 6. Trend Quality Metrics
-                t_score, t_signals, adx, r2, slope = calculate_trend_quality(df)
+                t_score, t_signals, adx, r2, slope = calculate_trend_quality(df, adx=bundle['adx'].iloc[-1])
                 
                 results.append({
                     "Ticker": symbol,
@@ -107,8 +112,11 @@ def screen_weekly_candidates(tickers):
         
         except Exception as e:
             print(f"Error in batch: {e}")
-        
-        time.sleep(0.3) # Gentle pacing
+
+    bad = {symbol for symbol, _ in rejected}
+    released = [s for s in rechecks if s in fetched_ok and s not in bad]
+    if rejected or released:
+        sync_data.update_quarantine(rejected, released)
 
     report = pd.DataFrame(results)
     if not report.empty:
@@ -130,6 +138,8 @@ if __name__ == "__main__":
         top_candidates = candidates.head(100)
         output_path = "stock-bot/data/weekly_candidates.csv"
         top_candidates['Ticker'].to_csv(output_path, index=False, header=False)
+        with sync_data.connect_writer() as conn:
+            store_universe(conn, "WEEKLY", top_candidates['Ticker'])
         
         print("\n" + "="*50)
         print(f"WEEKLY SCAN COMPLETE: {len(candidates)} total passed filters.")
@@ -1,67 +1,73 @@
 import pandas as pd
 import numpy as np
-import vectorbt as vbt
-import duckdb
 import os
 import time
+import sync_data
 from rsi_alpha import find_bullish_divergence
-from trend_alpha import calculate_trend_quality
+from trend_alpha import score_trend_quality
 
-# --- CONFIG ---
-DB_PATH = "stock-bot/data/market_data.duckdb"
+# The screen is a lookup of each symbol's latest materialized features row (features.py, kept
+# current by sync_data), so no indicator is recomputed over the bars here.
+SCREEN_SQL = """
+SELECT f.symbol, f.close AS price, f.sma200, f.rsi14, f.adx14, f.slope, f.r_squared, f.slope_prev
+FROM features f
+JOIN coverage c ON c.symbol = f.symbol AND c.timeframe = f.timeframe AND c.last_ts = f.timestamp
+WHERE f.timeframe = '1Day'
+  AND c.n_rows >= 200
+  AND f.close > f.sma200
+  AND f.rsi14 <= $max_rsi
+  AND f.volume_sma20 >= $min_avg_volume
+ORDER BY f.symbol
+"""
+
+# Divergence and 1M performance only need the recent closes / RSI of the survivors
+TAIL_SQL = """
+SELECT symbol, close, rsi14 FROM features
+WHERE timeframe = '1Day' AND symbol IN (SELECT symbol FROM survivors)
+QUALIFY ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY timestamp DESC) <= 50
+ORDER BY symbol, timestamp
+"""
 
 def get_duckdb_candidates():
-    print(f"🚀 Initializing Fast Local Scan from {DB_PATH}...")
+    print(f"🚀 Initializing Fast Local Scan from {sync_data.snapshot_path()}...")
     start_time = time.time()
     
-    conn = duckdb.connect(DB_PATH)
+    # The published snapshot, so the scan runs alongside a sync instead of failing on its file lock
+    conn = sync_data.connect_reader()
     
-    # 1. Fetch all data from local DB
-    # We load it into a DataFrame to process with our existing Alpha logic
-    df_all = conn.execute("SELECT * FROM bars ORDER BY symbol, timestamp").df()
-    conn.close()
+    # 1. SMA200 / RSI / liquidity filters on the latest features row
+    total = conn.execute("SELECT COUNT(*) FROM coverage WHERE timeframe = '1Day'").fetchone()[0]
+    conn.execute(f"CREATE TEMP TABLE survivors AS {SCREEN_SQL}", {'max_rsi': 75, 'min_avg_volume': 500000})
+    survivors = conn.execute("SELECT * FROM survivors").df()
     
-    tickers = df_all['symbol'].unique()
-    results = []
+    # 2. The last 50 closes / RSI values of the survivors, sorted by symbol
+    cols = conn.execute(TAIL_SQL).fetchnumpy()
+    conn.close()
+    print(f"🔎 {len(survivors)}/{total} tickers passed the feature filters ({len(cols['symbol']):,} rows transferred)")
     
-    print(f"📊 Processing {len(tickers)} tickers locally...")
+    symbols = cols['symbol']
+    starts = np.searchsorted(symbols, survivors['symbol'], side='left')
+    ends = np.searchsorted(symbols, survivors['symbol'], side='right')
+    close_all, rsi_all = (np.asarray(cols[c], dtype=np.float64) for c in ('close', 'rsi14'))
     
-    for symbol in tickers:
-        df = df_all[df_all['symbol'] == symbol].copy()
-        if len(df) < 200: continue
-        
-        # Standardize columns for our indicators
-        df.columns = [col.capitalize() for col in df.columns]
-        close = df['Close']
-        price = close.iloc[-1]
+    results = []
+    for row, start, end in zip(survivors.itertuples(index=False), starts, ends):
+        close = close_all[start:end]
         
-        # 1. Primary Filter: Macro Uptrend (SMA 200)
-        sma200 = vbt.MA.run(close, window=200).ma.iloc[-1]
-        if price <= sma200: continue
-
-        # 2. Secondary Filter: RSI Threshold
-        rsi_series = vbt.RSI.run(close, window=14).rsi
-        rsi = rsi_series.iloc[-1]
-        if rsi > 75: continue 
-
-        # 3. Liquidity Filter: Average daily volume > 500k
-        avg_vol = df['Volume'].tail(20).mean()
-        if avg_vol < 500000: continue
-
-        # 4. Momentum Score
-        perf_1m = (close.iloc[-1] / close.iloc[-21] - 1) if len(close) > 21 else 0
+        # Momentum Score
+        perf_1m = close[-1] / close[-21] - 1
         
-        # 5. Bullish Divergence Detection
-        has_divergence = find_bullish_divergence(close, rsi_series)
+        # Bullish Divergence Detection (only the last window is inspected)
+        has_divergence = find_bullish_divergence(pd.Series(close), pd.Series(rsi_all[start:end]))
         
-        # 6. Trend Quality Metrics
-        t_score, t_signals, adx, r2, slope = calculate_trend_quality(df)
+        # Trend Quality Metrics
+        t_score, t_signals, adx, r2, slope = score_trend_quality(row.adx14, row.slope, row.r_squared, row.slope_prev, row.price)
         
         results.append({
-            "Ticker": symbol,
-            "Price": round(price, 2),
-            "SMA200": round(sma200, 2),
-            "RSI": round(rsi, 1),
+            "Ticker": row.symbol,
+            "Price": round(row.price, 2),
+            "SMA200": round(row.sma200, 2),
+            "RSI": round(row.rsi14, 1),
             "Perf_1M": round(perf_1m * 100, 2),
             "Divergence": has_divergence,
             "Trend_Score": t_score,
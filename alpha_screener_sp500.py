@@ -1,7 +1,7 @@
 import pandas as pd
 import numpy as np
 import vectorbt as vbt
-from alpaca.data.historical import StockHistoricalDataClient
+from alpaca_cache import CachedStockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
@@ -18,7 +18,7 @@ if not API_KEY:
     print("Error: Alpaca API Key missing in .env")
     exit(1)
 
-client = StockHistoricalDataClient(API_KEY, SECRET_KEY)
+client = CachedStockHistoricalDataClient(API_KEY, SECRET_KEY)
 
 def get_sp500_tickers():
     """Reads the S&P 500 list from the local CSV."""
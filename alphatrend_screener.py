@@ -1,7 +1,7 @@
 import os
 import pandas as pd
 import numpy as np
-from alpaca.data.historical import StockHistoricalDataClient
+from alpaca_cache import CachedStockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
@@ -14,7 +14,7 @@ load_dotenv("stock-bot/.env")
 API_KEY = os.getenv("ALPACA_API_KEY")
 API_SECRET = os.getenv("ALPACA_SECRET_KEY")
 
-client = StockHistoricalDataClient(API_KEY, API_SECRET)
+client = CachedStockHistoricalDataClient(API_KEY, API_SECRET)
 
 def get_sp500_tickers():
     try:
@@ -3,39 +3,16 @@ import pandas as pd
 import numpy as np
 import os
 import pandas_ta as ta
-from alpaca.data.historical import StockHistoricalDataClient
+from alpaca_cache import CachedStockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
-load_dotenv("stock-bot/.env")
-client = StockHistoricalDataClient(os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY"))
+from indicators import AlphaTrend
 
-def calculate_alphatrend_vbt(df, period=14, coeff=1):
-    df = df.copy()
-    df.columns = [c.capitalize() for c in df.columns]
-    tr = ta.true_range(df['High'], df['Low'], df['Close'])
-    atr = ta.sma(tr, length=period)
-    mfi = ta.mfi(df['High'], df['Low'], df['Close'], df['Volume'], length=period)
-    upt = df['Low'] - (atr * coeff)
-    downT = df['High'] + (atr * coeff)
-    alpha_trend = np.zeros(len(df))
-    close_vals = df['Close'].values
-    mfi_vals = mfi.values
-    upt_vals = upt.values
-    downT_vals = downT.values
-    for i in range(1, len(df)):
-        if np.isnan(mfi_vals[i]):
-            alpha_trend[i] = close_vals[i]
-            continue
-        if mfi_vals[i] >= 50:
-            alpha_trend[i] = max(upt_vals[i], alpha_trend[i-1])
-        else:
-            alpha_trend[i] = min(downT_vals[i], alpha_trend[i-1])
-    df['At_k1'] = alpha_trend
-    df['At_k2'] = pd.Series(alpha_trend).shift(2).values
-    return df
+load_dotenv("stock-bot/.env")
+client = CachedStockHistoricalDataClient(os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY"))
 
 def run_active_swing_test(tickers):
     # Fetching 2 years of 4-Hour data
@@ -50,11 +27,12 @@ def run_active_swing_test(tickers):
             df_hour = bars.xs(ticker).copy()
             df = df_hour.resample('4H').agg({'open':'first', 'high':'max', 'low':'min', 'close':'last', 'volume':'sum'}).dropna()
             
-            df = calculate_alphatrend_vbt(df)
+            df.columns = [c.capitalize() for c in df.columns]
+            at = AlphaTrend.run(df['High'], df['Low'], df['Close'], df['Volume'])
             
             # Entry: AlphaTrend Flip + RSI not overbought
             rsi = ta.rsi(df['Close'], length=14)
-            at_bullish = df['At_k1'] > df['At_k2']
+            at_bullish = at.k1 > at.k2
             entries = (at_bullish) & (at_bullish.shift(1) == False) & (rsi < 65)
             exits = (at_bullish == False) & (at_bullish.shift(1) == True)
             
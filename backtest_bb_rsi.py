@@ -2,7 +2,7 @@ import vectorbt as vbt
 import pandas as pd
 import numpy as np
 import os
-from alpaca.data.historical import StockHistoricalDataClient
+from alpaca_cache import CachedStockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
@@ -14,7 +14,7 @@ load_dotenv("stock-bot/.env")
 API_KEY = os.getenv("ALPACA_API_KEY")
 API_SECRET = os.getenv("ALPACA_SECRET_KEY")
 
-client = StockHistoricalDataClient(API_KEY, API_SECRET)
+client = CachedStockHistoricalDataClient(API_KEY, API_SECRET)
 
 def run_bb_rsi_backtest(ticker="SPY"):
     print(f"Fetching 5 years of data for {ticker}...")
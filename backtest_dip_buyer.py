@@ -1,6 +1,7 @@
 import vectorbt as vbt
 import pandas as pd
 import numpy as np
+from csv_cache import read_csv_cached
 
 # Config
 symbols = ["SPY", "QQQ", "IWM", "AAPL", "MSFT", "NVDA", "TSLA", "AMD", "GLD", "TLT"]
@@ -11,7 +12,7 @@ def load_data():
     close_prices = {}
     for s in symbols:
         try:
-            df = pd.read_csv(f"{data_dir}/{s}_1Day.csv", parse_dates=True, index_col=0)
+            df = read_csv_cached(f"{data_dir}/{s}_1Day.csv")
             close_prices[s] = df['Close']
         except FileNotFoundError:
             print(f"Warning: {s} data not found.")
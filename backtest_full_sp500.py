@@ -2,48 +2,17 @@ import vectorbt as vbt
 import pandas as pd
 import numpy as np
 import os
-import pandas_ta as ta
-from alpaca.data.historical import StockHistoricalDataClient
+from alpaca_cache import CachedStockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import time
 
-load_dotenv("stock-bot/.env")
-client = StockHistoricalDataClient(os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY"))
+from indicators import AlphaTrend
 
-def calculate_alphatrend_vbt(df, period=14, coeff=1):
-    df = df.copy()
-    # Ensure Title Case
-    df.columns = [c.capitalize() for c in df.columns]
-    
-    tr = ta.true_range(df['High'], df['Low'], df['Close'])
-    atr = ta.sma(tr, length=period)
-    mfi = ta.mfi(df['High'], df['Low'], df['Close'], df['Volume'], length=period)
-    
-    # Fill NaNs for the start of the series
-    atr = atr.fillna(0)
-    mfi = mfi.fillna(50)
-    
-    upt = df['Low'] - (atr * coeff)
-    downT = df['High'] + (atr * coeff)
-    
-    alpha_trend = np.zeros(len(df))
-    close_vals = df['Close'].values
-    mfi_vals = mfi.values
-    upt_vals = upt.values
-    downT_vals = downT.values
-    
-    for i in range(1, len(df)):
-        if mfi_vals[i] >= 50:
-            alpha_trend[i] = max(upt_vals[i], alpha_trend[i-1])
-        else:
-            alpha_trend[i] = min(downT_vals[i], alpha_trend[i-1])
-            
-    df['At_k1'] = alpha_trend
-    df['At_k2'] = pd.Series(alpha_trend).shift(2).values
-    return df
+load_dotenv("stock-bot/.env")
+client = CachedStockHistoricalDataClient(os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY"))
 
 def run_full_universe_scan():
     # Load tickers
@@ -83,10 +52,10 @@ def run_full_universe_scan():
                     
                     if len(df) < 50: continue
                     
-                    df = calculate_alphatrend_vbt(df)
+                    at = AlphaTrend.run(df['high'], df['low'], df['close'], df['volume'])
                     
                     # Logic
-                    at_bullish = df['At_k1'] > df['At_k2']
+                    at_bullish = at.k1 > at.k2
                     entries = (at_bullish) & (at_bullish.shift(1) == False)
                     exits = (at_bullish == False) & (at_bullish.shift(1) == True)
                     
@@ -2,36 +2,20 @@ import vectorbt as vbt
 import pandas as pd
 import numpy as np
 import os
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest
-from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 import pandas_ta as ta
 
 # Import logic from indicators.py
 from indicators import calculate_alphatrend, calculate_bb_rsi
+from market_data import MarketDataRepository
 
-# Load credentials
-load_dotenv("stock-bot/.env")
-API_KEY = os.getenv("ALPACA_API_KEY")
-API_SECRET = os.getenv("ALPACA_SECRET_KEY")
-
-client = StockHistoricalDataClient(API_KEY, API_SECRET)
+repo = MarketDataRepository()
 
 def run_hybrid_backtest(ticker="SPY"):
     print(f"Fetching 5 years of data for {ticker}...")
     start_date = datetime.now() - timedelta(days=365 * 5)
     
-    request_params = StockBarsRequest(
-        symbol_or_symbols=ticker,
-        timeframe=TimeFrame.Day,
-        start=start_date,
-        adjustment='all'
-    )
-    bars = client.get_stock_bars(request_params).df
-    df = bars.xs(ticker).copy()
-    df.columns = [col.capitalize() for col in df.columns]
+    df = repo.get_bars(ticker, start=start_date)[ticker]
     
     print(f"Calculating Hybrid Signals for {ticker}...")
     # 1. Base Indicators
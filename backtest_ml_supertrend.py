@@ -2,32 +2,17 @@ import vectorbt as vbt
 import pandas as pd
 import numpy as np
 import os
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest
-from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 from indicators import calculate_machine_learning_supertrend
+from market_data import MarketDataRepository
 
-# Load credentials
-load_dotenv("stock-bot/.env")
-API_KEY = os.getenv("ALPACA_API_KEY")
-API_SECRET = os.getenv("ALPACA_SECRET_KEY")
-
-client = StockHistoricalDataClient(API_KEY, API_SECRET)
+repo = MarketDataRepository()
 
 def run_ml_backtest(ticker="SPY"):
     print(f"Fetching 5 years of data for {ticker}...")
     start_date = datetime.now() - timedelta(days=365 * 5)
     
-    request_params = StockBarsRequest(
-        symbol_or_symbols=ticker,
-        timeframe=TimeFrame.Day,
-        start=start_date,
-        adjustment='all'
-    )
-    bars = client.get_stock_bars(request_params).df
-    df = bars.xs(ticker).copy()
+    df = repo.get_bars(ticker, start=start_date)[ticker]
     
     print(f"Calculating ML Adaptive SuperTrend for {ticker} (this may take a moment due to K-Means loops)...")
     df_ml = calculate_machine_learning_supertrend(df)
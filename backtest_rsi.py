@@ -1,17 +1,16 @@
 import vectorbt as vbt
 import pandas as pd
 import numpy as np
+from csv_cache import read_csv_cached
 
 def run_rsi_strategy(ticker, rsi_window=14, entry_threshold=30, exit_threshold=70):
     print(f"\n--- Backtesting RSI Strategy on {ticker} ---")
     
     # Load data
     try:
-        data = pd.read_csv(f"stock-bot/data/{ticker}.csv", index_col=0, parse_dates=True)
-        # Handle Yahoo Finance multi-header mess if present
-        if "Price" in data.columns and "Ticker" in data.columns: # Skip new yfinance header rows
-             data = pd.read_csv(f"stock-bot/data/{ticker}.csv", index_col=0, parse_dates=True, header=2)
-             
+        # The cache also handles the Yahoo Finance multi-header format
+        data = read_csv_cached(f"stock-bot/data/{ticker}.csv")
+
         # Select Close price. Adjust column name if needed based on CSV format.
         # VectorBT expects a Series for single asset
         if 'Close' in data.columns:
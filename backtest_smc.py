@@ -2,18 +2,12 @@ import vectorbt as vbt
 import pandas as pd
 import numpy as np
 import os
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest
-from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 
-# Load credentials
-load_dotenv("stock-bot/.env")
-API_KEY = os.getenv("ALPACA_API_KEY")
-API_SECRET = os.getenv("ALPACA_SECRET_KEY")
+from rolling import centered_rolling_max, centered_rolling_min
+from market_data import MarketDataRepository
 
-client = StockHistoricalDataClient(API_KEY, API_SECRET)
+repo = MarketDataRepository()
 
 def calculate_smc_signals(df, window=5):
     """
@@ -27,9 +21,13 @@ def calculate_smc_signals(df, window=5):
     low = df['Low']
     close = df['Close']
     
-    # 1. Swing Points
-    df['swing_high'] = high[(high == high.rolling(window=window*2+1, center=True).max())]
-    df['swing_low'] = low[(low == low.rolling(window=window*2+1, center=True).min())]
+    # 1. Swing Points (centered window; a swing is only confirmed `window` bars after it prints)
+    df['swing_high'] = high[(high == centered_rolling_max(high, window))]
+    df['swing_low'] = low[(low == centered_rolling_min(low, window))]
+    # Row i: extreme of the window centered on i - window, the newest swing known at bar i
+    known_high = centered_rolling_max(high, window, confirmed=True).to_numpy()
+    known_low = centered_rolling_min(low, window, confirmed=True).to_numpy()
+    high, low, close = high.to_numpy(), low.to_numpy(), close.to_numpy()
     
     # 2. Market Structure
     last_sh = 0
@@ -44,25 +42,25 @@ def calculate_smc_signals(df, window=5):
     
     for i in range(window*2, len(df)):
         # Update last known swings
-        if not np.isnan(df['swing_high'].iloc[i-window]):
-            last_sh = df['swing_high'].iloc[i-window]
-        if not np.isnan(df['swing_low'].iloc[i-window]):
-            last_sl = df['swing_low'].iloc[i-window]
+        if high[i-window] == known_high[i]:
+            last_sh = high[i-window]
+        if low[i-window] == known_low[i]:
+            last_sl = low[i-window]
             
         # Detect CHoCH (Change of Character)
-        if structure <= 0 and close.iloc[i] > last_sh and last_sh != 0:
+        if structure <= 0 and close[i] > last_sh and last_sh != 0:
             structure = 1 # Shift to Bullish
             # Order Block is the low of the move that caused the break
             order_block_low = last_sl
-            order_block_high = (last_sl + close.iloc[i]) / 2 # Simplified zone
+            order_block_high = (last_sl + close[i]) / 2 # Simplified zone
             
-        elif structure >= 0 and close.iloc[i] < last_sl and last_sl != 0:
+        elif structure >= 0 and close[i] < last_sl and last_sl != 0:
             structure = -1 # Shift to Bearish
             exits[i] = True # Exit longs on Bearish CHoCH
             
         # Entry Logic: If Bullish, wait for price to return to the Order Block
         if structure == 1 and order_block_low != 0:
-            if low.iloc[i] <= order_block_high and close.iloc[i] > order_block_low:
+            if low[i] <= order_block_high and close[i] > order_block_low:
                 entries[i] = True
                 order_block_low = 0 # Reset after entry to avoid double entry
                 
@@ -72,15 +70,7 @@ def run_smc_backtest(ticker="SPY"):
     print(f"Fetching 5 years of data for {ticker}...")
     start_date = datetime.now() - timedelta(days=365 * 5)
     
-    request_params = StockBarsRequest(
-        symbol_or_symbols=ticker,
-        timeframe=TimeFrame.Day,
-        start=start_date,
-        adjustment='all'
-    )
-    bars = client.get_stock_bars(request_params).df
-    df = bars.xs(ticker).copy()
-    df.columns = [col.capitalize() for col in df.columns]
+    df = repo.get_bars(ticker, start=start_date)[ticker]
     
     print(f"Calculating SMC Signals for {ticker}...")
     entries, exits = calculate_smc_signals(df)
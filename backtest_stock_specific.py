@@ -3,67 +3,27 @@ import pandas as pd
 import numpy as np
 import os
 import pandas_ta as ta
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest
-from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 
-# Load credentials
-load_dotenv("stock-bot/.env")
-client = StockHistoricalDataClient(os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY"))
+from indicators import AlphaTrend
+from market_data import MarketDataRepository
 
-def calculate_alphatrend_vbt(df, period=14, coeff=1):
-    """VBT-compatible AlphaTrend logic"""
-    df = df.copy()
-    # Ensure column casing
-    df.columns = [c.capitalize() for c in df.columns]
-    
-    tr = ta.true_range(df['High'], df['Low'], df['Close'])
-    atr = ta.sma(tr, length=period)
-    mfi = ta.mfi(df['High'], df['Low'], df['Close'], df['Volume'], length=period)
-    
-    upt = df['Low'] - (atr * coeff)
-    downT = df['High'] + (atr * coeff)
-    
-    alpha_trend = np.zeros(len(df))
-    close_vals = df['Close'].values
-    mfi_vals = mfi.values
-    upt_vals = upt.values
-    downT_vals = downT.values
-    
-    for i in range(1, len(df)):
-        if np.isnan(mfi_vals[i]) or i == 0:
-            alpha_trend[i] = close_vals[i]
-            continue
-            
-        if mfi_vals[i] >= 50:
-            alpha_trend[i] = max(upt_vals[i], alpha_trend[i-1])
-        else:
-            alpha_trend[i] = min(downT_vals[i], alpha_trend[i-1])
-                
-    at_k1 = alpha_trend
-    at_k2 = pd.Series(at_k1).shift(2).values
-    
-    df['At_k1'] = at_k1
-    df['At_k2'] = at_k2
-    return df
+repo = MarketDataRepository()
 
 def run_stock_specific_backtest(tickers):
     start_date = datetime.now() - timedelta(days=365 * 5)
-    request_params = StockBarsRequest(symbol_or_symbols=tickers, timeframe=TimeFrame.Day, start=start_date, adjustment='all')
-    bars = client.get_stock_bars(request_params).df
+    bars = repo.get_bars(tickers, start=start_date)
     
     summary = []
     
     for ticker in tickers:
         try:
-            df = bars.xs(ticker).copy()
-            df = calculate_alphatrend_vbt(df)
+            df = bars[ticker]
+            at = AlphaTrend.run(df['High'], df['Low'], df['Close'], df['Volume'])
             
             # 1. AlphaTrend (Trend Follower)
-            at_entries = (df['At_k1'] > df['At_k2']) & (pd.Series(df['At_k1']).shift(1) <= pd.Series(df['At_k2']).shift(1)).values
-            at_exits = (df['At_k1'] < df['At_k2']) & (pd.Series(df['At_k1']).shift(1) >= pd.Series(df['At_k2']).shift(1)).values
+            at_entries = at.buy
+            at_exits = at.sell
             
             # 2. Aggressive RSI Swing (Higher Frequency)
             # Buy when RSI < 45, Sell when RSI > 65
@@ -73,7 +33,7 @@ def run_stock_specific_backtest(tickers):
             
             # 3. Hybrid: Trend-Aligned RSI
             # Only buy the RSI dip if AlphaTrend is Bullish
-            hybrid_entries = rsi_entries & (df['At_k1'] > df['At_k2'])
+            hybrid_entries = rsi_entries & (at.k1 > at.k2)
             hybrid_exits = at_exits | rsi_exits
             
             # Run Portfolios
@@ -1,6 +1,7 @@
 import vectorbt as vbt
 import pandas as pd
 import pandas_ta as ta
+from csv_cache import read_csv_cached
 
 # Config
 symbols = ["SPY", "QQQ", "IWM", "AAPL", "MSFT", "NVDA", "TSLA", "AMD", "GLD", "TLT"]
@@ -9,7 +10,7 @@ data_dir = "stock-bot/data"
 def load_data(ticker):
     try:
         # Load Data
-        df = pd.read_csv(f"{data_dir}/{ticker}_1Day.csv", parse_dates=True, index_col=0)
+        df = read_csv_cached(f"{data_dir}/{ticker}_1Day.csv")
         return df
     except FileNotFoundError:
         return None
@@ -2,22 +2,16 @@ import vectorbt as vbt
 import pandas as pd
 import numpy as np
 import os
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest
-from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 import pandas_ta as ta
 from indicators import calculate_alphatrend
+from market_data import MarketDataRepository
 
-load_dotenv("stock-bot/.env")
-client = StockHistoricalDataClient(os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY"))
+repo = MarketDataRepository()
 
 def get_ticker_data(ticker):
     start_date = datetime.now() - timedelta(days=365 * 5)
-    request_params = StockBarsRequest(symbol_or_symbols=ticker, timeframe=TimeFrame.Day, start=start_date, adjustment='all')
-    bars = client.get_stock_bars(request_params).df
-    df = bars.xs(ticker).copy()
+    df = repo.get_bars(ticker, start=start_date)[ticker]
     
     # Ensure column names are capitalized
     df.columns = [col.capitalize() for col in df.columns]
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import duckdb
+import pandas as pd
+from alpaca.data.models import BarSet
+
+import sync_data
+from fake_bars_server import _bar
+
+# Warehouse ingest benchmark: the old per-batch pandas INSERT OR IGNORE path against
+# Arrow staging plus one merge per run, on synthetic raw API responses.
+
+N_SYMBOLS = 2000
+N_BARS = 600  # hourly bars per symbol -> 1.2M rows
+BATCH_SIZE = 100
+
+def make_responses(overlap=0.1):
+    """Raw bars responses, one per 100-symbol batch; `overlap` of each symbol's bars are repeated to exercise dedup."""
+    start = datetime(2026, 1, 5, 14, tzinfo=timezone.utc)
+    stamps = [start + timedelta(hours=h) for h in range(N_BARS)]
+    stamps += stamps[:int(N_BARS * overlap)]
+    symbols = [f"S{i:04d}" for i in range(N_SYMBOLS)]
+    return [
+        {symbol: [_bar(symbol, ts) for ts in stamps] for symbol in symbols[i:i + BATCH_SIZE]}
+        for i in range(0, N_SYMBOLS, BATCH_SIZE)
+    ]
+
+def legacy_ingest(conn, responses):
+    """The previous path: BarSet -> pandas per batch, register, INSERT OR IGNORE against the primary key."""
+    for raw in responses:
+        df = BarSet(raw).df.reset_index()
+        df['timestamp'] = df['timestamp'].dt.tz_convert('UTC').dt.tz_localize(None)
+        conn.register("temp_df", df)
+        conn.execute(f"""
+            INSERT OR IGNORE INTO {sync_data.HOURLY_TABLE}
+            SELECT symbol, timestamp, "open", "high", "low", "close", "volume", "trade_count", "vwap"
+            FROM temp_df
+        """)
+        conn.unregister("temp_df")
+
+def arrow_ingest(conn, responses):
+    """The current path: raw JSON -> Arrow, append to staging, one deduplicating merge (roll-up refresh included)."""
+    sync_data.create_staging(conn)
+    for raw in responses:
+        sync_data.stage_bars(conn, sync_data.bars_to_arrow(raw))
+    return sync_data.merge_staged(conn, sync_data.HOURLY_TABLE)
+
+if __name__ == "__main__":
+    print("🧪 Generating synthetic responses...")
+    responses = make_responses()
+    n_rows = sum(len(bars) for raw in responses for bars in raw.values())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, ingest in (("legacy (pandas + INSERT OR IGNORE)", legacy_ingest), ("arrow (staging + merge)", arrow_ingest)):
+            sync_data.DB_PATH = os.path.join(tmp, f"{ingest.__name__}.duckdb")
+            sync_data.init_db()
+            conn = duckdb.connect(sync_data.DB_PATH)
+            start_time = time.time()
+            ingest(conn, responses)
+            elapsed = time.time() - start_time
+            stored = conn.execute(f"SELECT COUNT(*) FROM {sync_data.HOURLY_TABLE}").fetchone()[0]
+            conn.close()
+            results[name] = {"Rows In": n_rows, "Rows Stored": stored, "Seconds": round(elapsed, 2), "Rows/s": round(n_rows / elapsed)}
+            print(f"  {name}: {n_rows:,} rows in {elapsed:.1f}s")
+
+    print(pd.DataFrame(results).T.to_markdown())
@@ -3,22 +3,16 @@ import pandas as pd
 import pandas_ta as ta
 import numpy as np
 import os
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest
-from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 
-load_dotenv("stock-bot/.env")
-client = StockHistoricalDataClient(os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY"))
+from rolling import rolling_max, rolling_min, rolling_mean_std
+from market_data import MarketDataRepository
+
+repo = MarketDataRepository()
 
 def get_data(ticker="SPY"):
     start_date = datetime.now() - timedelta(days=365 * 5)
-    request_params = StockBarsRequest(symbol_or_symbols=ticker, timeframe=TimeFrame.Day, start=start_date, adjustment='all')
-    bars = client.get_stock_bars(request_params).df
-    df = bars.xs(ticker).copy()
-    df.columns = [col.capitalize() for col in df.columns]
-    return df
+    return repo.get_bars(ticker, start=start_date)[ticker]
 
 def run_test(name, df, entries, exits):
     try:
@@ -59,8 +53,9 @@ def batch_1(df):
     results.append(run_test("Fisher Transform", df, (fish.iloc[:,0] > fish.iloc[:,1]), (fish.iloc[:,0] < fish.iloc[:,1])))
 
     # 6. Donchian Channels (20)
-    dc = ta.donchian(df['High'], df['Low'], lower_length=20, upper_length=20)
-    results.append(run_test("Donchian Channels", df, (close >= dc.iloc[:,2]), (close <= dc.iloc[:,0])))
+    dc_upper = rolling_max(df['High'], 20)
+    dc_lower = rolling_min(df['Low'], 20)
+    results.append(run_test("Donchian Channels", df, (close >= dc_upper), (close <= dc_lower)))
 
     # 7. Keltner Channels
     kc = ta.kc(df['High'], df['Low'], close)
@@ -186,7 +181,8 @@ def batch_4(df):
     low = df['Low']
     
     # 1. Z-Score (Buy < -2, Sell > 2)
-    zscore = ta.zscore(close, length=20)
+    mean, std = rolling_mean_std(close, 20)
+    zscore = (close - mean) / std
     results.append(run_test("Z-Score", df, (zscore < -2), (zscore > 2)))
 
     # 2. Know Sure Thing (KST)
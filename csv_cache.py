@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Columnar cache for the CSV research datasets (Alpaca `*_1Day.csv` and yfinance `*.csv`).
+# Each CSV is parsed once into a Parquet copy under `.cache/` next to it; later loads memory-map
+# the Parquet file instead of re-parsing text. The copy records the source's mtime and size and
+# is rebuilt as soon as either changes.
+
+CACHE_DIR = ".cache"
+SOURCE_KEY = b"source_stat"
+
+def _is_yfinance_multiheader(path):
+    """New yfinance downloads carry 'Price' / 'Ticker' / 'Date' header rows above the data."""
+    with open(path) as f:
+        first, second = f.readline(), f.readline()
+    return first.startswith("Price,") and second.startswith("Ticker,")
+
+def _parse_csv(path):
+    if _is_yfinance_multiheader(path):
+        # Keep the 'Price' row as the header and drop the ticker / 'Date' rows
+        df = pd.read_csv(path, index_col=0, parse_dates=True, skiprows=[1, 2])
+        df.index.name = "Date"
+        return df
+    return pd.read_csv(path, index_col=0, parse_dates=True)
+
+def cache_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, CACHE_DIR, os.path.splitext(name)[0] + ".parquet")
+
+def read_csv_cached(path):
+    """
+    pd.read_csv(path, index_col=0, parse_dates=True), served from the Parquet cache when it is current.
+    Raises FileNotFoundError when the CSV itself is missing, like read_csv.
+    """
+    stat = os.stat(path)
+    source = f"{stat.st_mtime_ns}:{stat.st_size}".encode()
+    cached = cache_path(path)
+
+    if os.path.exists(cached):
+        try:
+            if pq.read_schema(cached).metadata.get(SOURCE_KEY) == source:
+                return pq.read_table(cached, memory_map=True).to_pandas()
+        except (pa.ArrowInvalid, OSError, AttributeError):
+            pass  # Unreadable or foreign file: rebuild it
+
+    df = _parse_csv(path)
+    table = pa.Table.from_pandas(df)
+    table = table.replace_schema_metadata({**table.schema.metadata, SOURCE_KEY: source})
+    os.makedirs(os.path.dirname(cached), exist_ok=True)
+    # Write then rename, so a concurrent reader never sees half a file
+    tmp = f"{cached}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, cached)
+    return df
+
+if __name__ == "__main__":
+    import glob
+    import time
+
+    paths = sorted(glob.glob("stock-bot/data/*_1Day.csv")) + sorted(glob.glob("stock-bot/data/[A-Z]*[A-Z].csv"))
+    start_time = time.time()
+    parsed = {p: _parse_csv(p) for p in paths}
+    parse_time = time.time() - start_time
+
+    for p in paths:
+        read_csv_cached(p)  # warm
+    start_time = time.time()
+    cached = {p: read_csv_cached(p) for p in paths}
+    cached_time = time.time() - start_time
+
+    for p in paths:
+        pd.testing.assert_frame_equal(parsed[p], cached[p])
+    print(f"✅ {len(paths)} CSVs: parse {parse_time * 1000:.0f}ms, cached {cached_time * 1000:.0f}ms, frames identical.")
@@ -0,0 +1,194 @@
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+# Local stand-in for Alpaca's GET /v2/stocks/bars, for load-testing sync_data without touching the real API.
+# Bars are deterministic per (symbol, timestamp), the per-minute quota answers 429 like the real endpoint,
+# and a fraction of requests can be failed with 5xx to exercise the retry path. GET /stats reports the
+# achieved throughput; run the server in its own process so it doesn't share the client's GIL.
+
+def _bar(symbol, ts, factor=1.0):
+    seed = zlib.crc32(f"{symbol}{ts.isoformat()}".encode())
+    base = 20 + zlib.crc32(symbol.encode()) % 400
+    close = base * (1 + ((seed % 2001) - 1000) / 20000) * factor
+    spread = close * (seed % 97) / 5000
+    return {
+        "t": ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "o": round(close - spread / 2, 2),
+        "h": round(close + spread, 2),
+        "l": round(close - spread, 2),
+        "c": round(close, 2),
+        "v": 100000 + seed % 5000000,
+        "n": 100 + seed % 10000,
+        "vw": round(close, 2),
+    }
+
+def _utc(value):
+    ts = pd.Timestamp(value)
+    return (ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')).to_pydatetime()
+
+def _timestamps(timeframe, start, end):
+    if timeframe == "1Day":
+        # Alpaca stamps daily bars at midnight New York, i.e. 04:00/05:00Z
+        days = pd.bdate_range(start.date(), end.date())
+        return [d.to_pydatetime().replace(hour=5, tzinfo=timezone.utc) for d in days if start <= d.tz_localize('UTC') + timedelta(hours=5) <= end]
+    # Hourly bars cover extended hours, 4am-8pm New York (08:00-23:00Z in summer)
+    hours = pd.date_range(start.replace(minute=0, second=0, microsecond=0), end, freq="h")
+    return [h.to_pydatetime() for h in hours if h >= start and h.weekday() < 5 and 8 <= h.hour <= 23]
+
+class FakeBarsServer(ThreadingHTTPServer):
+    """
+    Serves /v2/stocks/bars on localhost.
+    quota_per_min: requests allowed in any trailing 60s before answering 429.
+    latency: seconds slept per request. error_rate: fraction of requests answered with 503.
+    splits: {symbol: (ex_date, ratio)}; with adjustment != 'raw', bars before ex_date are divided by ratio.
+    Stands in for the corporate-actions re-adjustment of history and can be changed while serving.
+    invalid: symbols the whole request is rejected for with 400 "invalid symbol: X", naming the first one
+    met unless name_invalid is False.
+    forming: price multiplier for the newest bar of an open-ended request, standing in for a still-forming
+    bar whose prices move until it settles; can be changed while serving.
+    """
+    daemon_threads = True
+
+    def __init__(self, port=0, quota_per_min=200, latency=0.05, error_rate=0.0, splits=None,
+                 invalid=(), name_invalid=True, forming=1.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.quota_per_min = quota_per_min
+        self.latency = latency
+        self.error_rate = error_rate
+        self.splits = splits or {}
+        self.invalid = set(invalid)
+        self.name_invalid = name_invalid
+        self.forming = forming
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0, 'rows': 0}
+        self.started = time.monotonic()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        self.started = time.monotonic()
+        return self
+
+    def admit(self):
+        """Returns the HTTP status to answer with: 200, 429 (over quota) or 503 (injected failure)."""
+        with self.lock:
+            now = time.monotonic()
+            self.stats['requests'] += 1
+            while self.recent and self.recent[0] <= now - 60:
+                self.recent.popleft()
+            if len(self.recent) >= self.quota_per_min:
+                self.stats['throttled'] += 1
+                return 429
+            self.recent.append(now)
+            if random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return 503
+            return 200
+
+    def report(self, reset=False):
+        """Counters since the last reset, plus achieved requests/s and rows/s."""
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            report = dict(self.stats, elapsed=elapsed,
+                          req_per_s=self.stats['requests'] / elapsed, rows_per_s=self.stats['rows'] / elapsed)
+            if reset:
+                self.stats = {k: 0 for k in self.stats}
+                self.started = time.monotonic()
+        return report
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            return self._send(200, self.server.report(reset="reset" in url.query))
+        if url.path != "/v2/stocks/bars":
+            return self._send(404, {"code": 40410000, "message": "endpoint not found"})
+        time.sleep(self.server.latency)
+        status = self.server.admit()
+        if status == 429:
+            return self._send(429, {"code": 42910000, "message": "too many requests"})
+        if status != 200:
+            return self._send(status, {"code": 50310000, "message": "service unavailable"})
+
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        symbols = query["symbols"].split(",")
+        bad = [s for s in symbols if s in self.server.invalid]
+        if bad:
+            return self._send(400, {"message": f"invalid symbol: {bad[0]}" if self.server.name_invalid else "invalid symbol"})
+        start = _utc(query["start"])
+        end = _utc(query["end"]) if "end" in query else datetime.now(timezone.utc) - timedelta(minutes=15)
+        stamps = _timestamps(query["timeframe"], start, end)
+
+        # Pages of at most `limit` bars in (symbol, timestamp) order; the token is the row offset
+        offset = int(query.get("page_token") or 0)
+        limit = int(query.get("limit") or 10000)
+        symbols = sorted(symbols)
+        total = len(symbols) * len(stamps)
+        page = range(offset, min(offset + limit, total))
+        bars = {}
+        for row in page:
+            symbol, ts = symbols[row // len(stamps)], stamps[row % len(stamps)]
+            split = self.server.splits.get(symbol) if query.get("adjustment", "raw") != "raw" else None
+            factor = 1 / split[1] if split and ts < split[0] else 1.0
+            if "end" not in query and ts == stamps[-1]:
+                factor *= self.server.forming
+            bars.setdefault(symbol, []).append(_bar(symbol, ts, factor))
+        with self.server.lock:
+            self.server.stats['rows'] += len(page)
+        next_token = str(page.stop) if page.stop < total else None
+        self._send(200, {"bars": bars, "next_page_token": next_token})
+
+def serve(port, **kwargs):
+    FakeBarsServer(port, **kwargs).serve_forever()
+
+if __name__ == "__main__":
+    import multiprocessing
+    import tempfile
+    import urllib.request
+    # Leave 429 handling to sync_data's backoff instead of the client's built-in fixed-wait retry
+    os.environ["APCA_RETRY_MAX"] = "0"
+    import sync_data
+    from alpaca.data.historical import StockHistoricalDataClient
+
+    port = 8765
+    url = f"http://127.0.0.1:{port}"
+    server = multiprocessing.Process(target=serve, args=(port,), kwargs={'quota_per_min': 200, 'latency': 1.0, 'error_rate': 0.05}, daemon=True)
+    server.start()
+    time.sleep(1)
+    sync_data.client = StockHistoricalDataClient("fake", "fake", raw_data=True, url_override=url)
+    tickers = [f"T{i:04d}" for i in range(2457)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for in_flight in (1, 4, 8):
+            sync_data.DB_PATH = os.path.join(tmp, f"market_data_{in_flight}.duckdb")
+            urllib.request.urlopen(f"{url}/stats?reset").read()
+            sync_data.sync_market_data(tickers=tickers, max_in_flight=in_flight)
+            s = json.loads(urllib.request.urlopen(f"{url}/stats").read())
+            print(f"📈 {in_flight} in flight: {s['requests']} requests ({s['throttled']} throttled, {s['errors']} failed), "
+                  f"{s['rows']:,} rows in {s['elapsed']:.1f}s = {s['req_per_s']:.1f} req/s, {s['rows_per_s']:,.0f} rows/s")
+    server.terminate()
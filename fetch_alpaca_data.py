@@ -1,4 +1,4 @@
-from alpaca.data.historical import StockHistoricalDataClient
+from alpaca_cache import CachedStockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
@@ -17,7 +17,7 @@ if not API_KEY or not SECRET_KEY:
     print("Error: API Keys missing.")
     exit(1)
 
-client = StockHistoricalDataClient(API_KEY, SECRET_KEY)
+client = CachedStockHistoricalDataClient(API_KEY, SECRET_KEY)
 
 def fetch_data(symbol, timeframe=TimeFrame.Day, days_back=1500):
     print(f"Fetching {symbol}...")
@@ -1,6 +1,8 @@
 import pandas as pd
 import requests
 import io
+import sync_data
+from universe import create_symbol_tables, store_universe
 
 def fetch_sp500():
     print("Fetching S&P 500 tickers from Wikipedia...")
@@ -97,5 +99,14 @@ def main():
     
     print(f"\nSaved all unique tickers to stock-bot/data/watchlist_expanded.csv")
 
+    # Which index each symbol came from, as bitmaps over the warehouse symbol ids (see universe.py).
+    # An index whose fetch failed keeps its previously stored membership.
+    with sync_data.connect_writer() as conn:
+        create_symbol_tables(conn)
+        for name, tickers in (("SP500", sp500), ("NDX", nasdaq100), ("DJIA", dow30), ("R2000", russell2000)):
+            if tickers:
+                store_universe(conn, name, tickers)
+    print(f"Stored the index universes in {sync_data.DB_PATH}")
+
 if __name__ == "__main__":
     main()
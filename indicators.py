@@ -1,9 +1,14 @@
 import pandas as pd
 import pandas_ta as ta
 import numpy as np
+import vectorbt as vbt
+import os
+from numba import njit
 
 from sklearn.cluster import KMeans
 
+from rolling import rolling_mean_std
+
 def calculate_bb_rsi(df, bb_period=200, bb_std=2.0, rsi_period=14, rsi_low=30, rsi_high=70):
     """
     Implementation of Bollinger + RSI, Double Strategy (by ChartArt) v1.1.
@@ -11,13 +16,10 @@ def calculate_bb_rsi(df, bb_period=200, bb_std=2.0, rsi_period=14, rsi_low=30, r
     df = df.copy()
     df.columns = [col.capitalize() for col in df.columns]
     
-    # Bollinger Bands
-    bb = ta.bbands(df['Close'], length=bb_period, std=bb_std)
-    # pandas-ta can sometimes use different naming for floats
-    col_l = [c for c in bb.columns if c.startswith('BBL')][0]
-    col_u = [c for c in bb.columns if c.startswith('BBU')][0]
-    df['bb_lower'] = bb[col_l]
-    df['bb_upper'] = bb[col_u]
+    # Bollinger Bands (population std, as ta.bbands), one Welford pass over the window
+    basis, dev = rolling_mean_std(df['Close'], bb_period, ddof=0)
+    df['bb_lower'] = basis - bb_std * dev
+    df['bb_upper'] = basis + bb_std * dev
     
     # RSI
     df['rsi'] = ta.rsi(df['Close'], length=rsi_period)
@@ -52,51 +54,365 @@ def calculate_macd(df, fast=12, slow=26, signal=9):
     
     return df
 
-def calculate_alphatrend(df, period=14, coeff=1):
+@njit(cache=True)
+def _alphatrend_nb(mfi, upt, downt):
+    """AlphaTrend trailing-stop recursion over (bars x symbols) arrays, seeded with 0.0."""
+    n, m = upt.shape
+    out = np.empty((n, m))
+    out[0, :] = 0.0
+    # Row-major walk keeps the inner loop on contiguous memory
+    for i in range(1, n):
+        for j in range(m):
+            prev = out[i - 1, j]
+            if mfi[i, j] >= 50:
+                # Uptrend logic: Trailing stop that can only move up
+                out[i, j] = prev if upt[i, j] < prev else upt[i, j]
+            else:
+                # Downtrend logic: Trailing stop that can only move down
+                out[i, j] = prev if downt[i, j] > prev else downt[i, j]
+    return out
+
+def alphatrend_kernel(mfi, upt, downt):
+    """
+    Runs the AlphaTrend recursion on 1D (bars) or 2D (bars x symbols) arrays.
+    """
+    mfi = np.asarray(mfi, dtype=np.float64)
+    is_1d = mfi.ndim == 1
+    if is_1d:
+        mfi = mfi[:, None]
+    upt = np.asarray(upt, dtype=np.float64).reshape(mfi.shape)
+    downt = np.asarray(downt, dtype=np.float64).reshape(mfi.shape)
+    if len(mfi) == 0:
+        out = np.empty(mfi.shape)
+    else:
+        out = _alphatrend_nb(np.ascontiguousarray(mfi), np.ascontiguousarray(upt), np.ascontiguousarray(downt))
+    return out[:, 0] if is_1d else out
+
+@njit(cache=True)
+def _alphatrend_panel_nb(high, low, close, volume, period, coeff):
+    """
+    Fused TR -> SMA(TR) -> MFI -> AlphaTrend pass, one column (symbol) at a time.
+    Mirrors pandas_ta's NaN seeding so each column matches the single-ticker path.
+    """
+    n, m = close.shape
+    # Stored symbol-major so each column is written contiguously; returned as a (bars x symbols) view
+    out = np.full((m, n), np.nan)
+    tr = np.empty(n)
+    pmf = np.empty(n)
+    nmf = np.empty(n)
+    for j in range(m):
+        start = n
+        for i in range(n):
+            if not np.isnan(close[i, j]):
+                start = i
+                break
+
+        tr_sum, p_sum, n_sum = 0.0, 0.0, 0.0
+        tr_nan, mf_nan = 0, 0
+        prev_tp = np.nan
+        prev = 0.0
+        for i in range(start, n):
+            h, l, c = high[i, j], low[i, j], close[i, j]
+
+            # True Range (no previous close on the first bar)
+            tr[i] = np.nan
+            if i > start:
+                pc = close[i - 1, j]
+                tr[i] = h - l
+                if abs(h - pc) > tr[i] or np.isnan(tr[i]):
+                    tr[i] = abs(h - pc)
+                if abs(pc - l) > tr[i] or np.isnan(tr[i]):
+                    tr[i] = abs(pc - l)
+
+            # Money flow split by typical price direction
+            tp = (h + l + c) / 3
+            rmf = tp * volume[i, j]
+            pmf[i] = rmf if tp - prev_tp > 0 else 0.0
+            nmf[i] = rmf if tp - prev_tp < 0 else 0.0
+            if np.isnan(c):
+                pmf[i] = np.nan
+                nmf[i] = np.nan
+            prev_tp = tp
+
+            # Rolling sums, a window is only valid without NaNs (pandas min_periods=period)
+            if np.isnan(tr[i]):
+                tr_nan += 1
+            else:
+                tr_sum += tr[i]
+            if np.isnan(pmf[i]) or np.isnan(nmf[i]):
+                mf_nan += 1
+            else:
+                p_sum += pmf[i]
+                n_sum += nmf[i]
+            if i - period >= start:
+                k = i - period
+                if np.isnan(tr[k]):
+                    tr_nan -= 1
+                else:
+                    tr_sum -= tr[k]
+                if np.isnan(pmf[k]) or np.isnan(nmf[k]):
+                    mf_nan -= 1
+                else:
+                    p_sum -= pmf[k]
+                    n_sum -= nmf[k]
+
+            full = i - start + 1 >= period
+            atr = tr_sum / period if full and tr_nan == 0 else np.nan
+            mfi = np.nan
+            if full and mf_nan == 0 and p_sum + n_sum != 0:
+                mfi = 100 * p_sum / (p_sum + n_sum)
+
+            if i == start:
+                prev = 0.0
+            elif mfi >= 50:
+                upt = l - atr * coeff
+                prev = prev if upt < prev else upt
+            else:
+                downt = h + atr * coeff
+                prev = prev if downt > prev else downt
+            out[j, i] = prev
+    return out.T
+
+BUNDLE_COLUMNS = ('tr', 'atr_sma', 'atr', 'rsi', 'mfi', 'dmp', 'dmn', 'adx', 'sma200')
+
+@njit(cache=True, error_model='numpy')
+def _indicator_bundle_nb(high, low, close, volume, length, sma_length):
+    """
+    One pass over a symbol's bars producing every indicator the scorers use (rows = BUNDLE_COLUMNS).
+    Wilder smoothing is pandas_ta's rma (adjusted EWM, alpha=1/length), carried as two decaying sums.
+    """
+    n = len(close)
+    out = np.full((len(BUNDLE_COLUMNS), n), np.nan)
+    if n == 0:
+        return out
+    decay = 1.0 - 1.0 / length
+    # rma accumulators: ATR, RSI gain/loss, +DM/-DM, DX (numerator, denominator, count)
+    rma_num = np.zeros(6)
+    rma_den = np.zeros(6)
+    rma_cnt = np.zeros(6, dtype=np.int64)
+    rma_val = np.full(6, np.nan)
+    pmf = np.zeros(n)
+    nmf = np.zeros(n)
+    tr_sum, p_sum, n_sum, c_sum = 0.0, 0.0, 0.0, 0.0
+
+    for i in range(n):
+        h, l, c = high[i], low[i], close[i]
+        tr, gain, loss, pos, neg = np.nan, np.nan, np.nan, np.nan, np.nan
+        tp = (h + l + c) / 3
+        if i > 0:
+            pc = close[i - 1]
+            tr = max(h - l, abs(h - pc), abs(pc - l))
+            change = c - pc
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            up = h - high[i - 1]
+            down = low[i - 1] - l
+            pos = up if (up > down and up > 0) else 0.0
+            neg = down if (down > up and down > 0) else 0.0
+            tp_change = tp - (high[i - 1] + low[i - 1] + pc) / 3
+            pmf[i] = tp * volume[i] if tp_change > 0 else 0.0
+            nmf[i] = tp * volume[i] if tp_change < 0 else 0.0
+        out[0, i] = tr
+
+        # Rolling windows: SMA of TR (from bar 1), MFI flows and SMA200 (from bar 0)
+        if i > 0:
+            tr_sum += tr
+            if i > length:
+                tr_sum -= out[0, i - length]
+            if i >= length:
+                out[1, i] = tr_sum / length
+        p_sum += pmf[i]
+        n_sum += nmf[i]
+        if i >= length:
+            p_sum -= pmf[i - length]
+            n_sum -= nmf[i - length]
+        if i >= length - 1:
+            out[4, i] = 100 * p_sum / (p_sum + n_sum)
+        c_sum += c
+        if i >= sma_length:
+            c_sum -= close[i - sma_length]
+        if i >= sma_length - 1:
+            out[8, i] = c_sum / sma_length
+
+        # Wilder-smoothed series share the same update; index 5 (DX) is fed below
+        inputs = (tr, gain, loss, pos, neg)
+        for k in range(5):
+            x = inputs[k]
+            if np.isnan(x):
+                rma_num[k] *= decay
+                rma_den[k] *= decay
+                continue
+            rma_num[k] = x + decay * rma_num[k]
+            rma_den[k] = 1.0 + decay * rma_den[k]
+            rma_cnt[k] += 1
+            if rma_cnt[k] >= length:
+                rma_val[k] = rma_num[k] / rma_den[k]
+        out[2, i] = rma_val[0]
+        out[3, i] = 100 * rma_val[1] / (rma_val[1] + rma_val[2])
+        k = 100 / rma_val[0]
+        dmp = k * rma_val[3]
+        dmn = k * rma_val[4]
+        out[5, i] = dmp
+        out[6, i] = dmn
+        dx = 100 * abs(dmp - dmn) / (dmp + dmn)
+        if not np.isnan(dx):
+            rma_num[5] = dx + decay * rma_num[5]
+            rma_den[5] = 1.0 + decay * rma_den[5]
+            rma_cnt[5] += 1
+            if rma_cnt[5] >= length:
+                rma_val[5] = rma_num[5] / rma_den[5]
+        elif rma_cnt[5]:
+            rma_num[5] *= decay
+            rma_den[5] *= decay
+        out[7, i] = rma_val[5]
+    return out
+
+def indicator_bundle_arrays(high, low, close, volume, length=14, sma_length=200):
+    """
+    Array form of calculate_indicator_bundle for callers holding raw NumPy columns (or views into them).
+    Returns a dict of 1D arrays keyed by BUNDLE_COLUMNS.
+    """
+    h, l, c, v = (np.asarray(x, dtype=np.float64) for x in (high, low, close, volume))
+    values = _indicator_bundle_nb(h, l, c, v, length, sma_length)
+    return dict(zip(BUNDLE_COLUMNS, values))
+
+def calculate_indicator_bundle(df, length=14, sma_length=200):
+    """
+    Fused replacement for the separate ta.true_range / ta.sma / ta.atr / ta.rsi / ta.mfi / ta.adx
+    calls plus the SMA200, computed in one pass over the OHLCV arrays.
+    Returns a DataFrame on df's index with columns BUNDLE_COLUMNS
+    ('atr_sma' is AlphaTrend's SMA of True Range, 'atr' is Wilder's ATR).
+    """
+    h, l, c, v = (df[col].to_numpy(dtype=np.float64) for col in ('High', 'Low', 'Close', 'Volume'))
+    values = _indicator_bundle_nb(h, l, c, v, length, sma_length)
+    return pd.DataFrame(values.T, index=df.index, columns=list(BUNDLE_COLUMNS))
+
+def calculate_alphatrend(df, period=14, coeff=1, bundle=None):
     """
     Python implementation of the AlphaTrend indicator by KivancOzbilgic.
+    Pass a calculate_indicator_bundle result (same period) to reuse it instead of recomputing.
     """
     df = df.copy()
+    if bundle is None:
+        bundle = calculate_indicator_bundle(df, length=period)
     
     # Calculate components
-    df['tr'] = ta.true_range(df['High'], df['Low'], df['Close'])
-    df['atr'] = ta.sma(df['tr'], length=period)
-    df['rsi'] = ta.rsi(df['Close'], length=period)
-    df['mfi'] = ta.mfi(df['High'], df['Low'], df['Close'], df['Volume'], length=period)
+    df['tr'] = bundle['tr']
+    df['atr'] = bundle['atr_sma']
+    df['rsi'] = bundle['rsi']
+    df['mfi'] = bundle['mfi']
     
     upt = df['Low'] - (df['atr'] * coeff)
     downT = df['High'] + (df['atr'] * coeff)
     
-    alpha_trend = [0.0] * len(df)
-    
     # Use MFI as the primary trend filter (as per the TradingView script)
-    # If no volume data, it defaults to RSI
-    for i in range(1, len(df)):
-        mfi_val = df['mfi'].iloc[i]
-        
-        if mfi_val >= 50:
-            # Uptrend logic: Trailing stop that can only move up
+    df['At_k1'] = alphatrend_kernel(df['mfi'].values, upt.values, downT.values)
+    df['At_k2'] = df['At_k1'].shift(2)
+    
+    # Buy signal: k1 crosses above k2
+    df['at_buy'] = (df['At_k1'] > df['At_k2']) & (df['At_k1'].shift(1) <= df['At_k2'].shift(1))
+    # Sell signal: k1 crosses below k2
+    df['at_sell'] = (df['At_k1'] < df['At_k2']) & (df['At_k1'].shift(1) >= df['At_k2'].shift(1))
+    
+    return df
+
+def calculate_alphatrend_panel(high, low, close, volume, period=14, coeff=1):
+    """
+    AlphaTrend for a whole universe in one call.
+    Inputs are (bars x symbols) DataFrames on a shared index; leading NaNs (late listings)
+    are skipped per column so each symbol matches calculate_alphatrend on its own history.
+    Returns a dict of DataFrames keyed like the single-ticker columns.
+    """
+    h, l, c, v = (np.asfortranarray(x.to_numpy(dtype=np.float64)) for x in (high, low, close, volume))
+    at_k1 = pd.DataFrame(_alphatrend_panel_nb(h, l, c, v, period, float(coeff)), index=close.index, columns=close.columns)
+    at_k2 = at_k1.shift(2)
+    return {
+        'At_k1': at_k1,
+        'At_k2': at_k2,
+        'at_buy': (at_k1 > at_k2) & (at_k1.shift(1) <= at_k2.shift(1)),
+        'at_sell': (at_k1 < at_k2) & (at_k1.shift(1) >= at_k2.shift(1)),
+    }
+
+@njit(cache=True)
+def _alphatrend_apply_nb(high, low, close, volume, period, coeff):
+    """vectorbt apply function: one (period, coeff) combination over every input column."""
+    k1 = np.ascontiguousarray(_alphatrend_panel_nb(high, low, close, volume, period, coeff))
+    k2 = np.full_like(k1, np.nan)
+    k2[2:] = k1[:-2]
+    return k1, k2
+
+# AlphaTrend as a vectorbt indicator: broadcasts (period, coeff) grids across many symbols in one call.
+# AlphaTrend.run(high, low, close, volume, period=[10, 14, 20], coeff=[0.8, 1.0], param_product=True)
+AlphaTrend = vbt.IndicatorFactory(
+    class_name='AlphaTrend',
+    short_name='at',
+    input_names=['high', 'low', 'close', 'volume'],
+    param_names=['period', 'coeff'],
+    output_names=['k1', 'k2'],
+    custom_output_props=dict(
+        # Same crossover rules as at_buy / at_sell in calculate_alphatrend
+        buy=lambda self: (self.k1 > self.k2) & (self.k1.shift(1) <= self.k2.shift(1)),
+        sell=lambda self: (self.k1 < self.k2) & (self.k1.shift(1) >= self.k2.shift(1)),
+    ),
+).from_apply_func(
+    _alphatrend_apply_nb,
+    period=14,
+    coeff=1.0,
+    numba_loop=True,
+)
+
+def _alphatrend_reference(mfi, upt, downT):
+    """Original per-bar loop, kept as the parity baseline for the compiled kernel."""
+    alpha_trend = [0.0] * len(mfi)
+    for i in range(1, len(mfi)):
+        if mfi.iloc[i] >= 50:
             if upt.iloc[i] < alpha_trend[i-1]:
                 alpha_trend[i] = alpha_trend[i-1]
             else:
                 alpha_trend[i] = upt.iloc[i]
         else:
-            # Downtrend logic: Trailing stop that can only move down
             if downT.iloc[i] > alpha_trend[i-1]:
                 alpha_trend[i] = alpha_trend[i-1]
             else:
                 alpha_trend[i] = downT.iloc[i]
-                
-    df['At_k1'] = alpha_trend
-    df['At_k2'] = df['At_k1'].shift(2)
-    
-    # Buy signal: k1 crosses above k2
-    df['at_buy'] = (df['At_k1'] > df['At_k2']) & (df['At_k1'].shift(1) <= df['At_k2'].shift(1))
-    # Sell signal: k1 crosses below k2
-    df['at_sell'] = (df['At_k1'] < df['At_k2']) & (df['At_k1'].shift(1) >= df['At_k2'].shift(1))
-    
-    return df
+    return alpha_trend
 
 if __name__ == "__main__":
-    # Test with a dummy DF or local data if available
-    print("AlphaTrend logic loaded.")
+    # Parity check: compiled kernel and panel entry point vs. the original loop on local data
+    import glob
+    import time
+    frames = {}
+    for path in sorted(glob.glob("stock-bot/data/*_1Day.csv")):
+        ticker = os.path.basename(path).replace("_1Day.csv", "")
+        frames[ticker] = pd.read_csv(path, parse_dates=True, index_col=0)
+
+    for ticker, df in frames.items():
+        # Fused bundle vs. the individual pandas_ta calls it replaces
+        bundle = calculate_indicator_bundle(df)
+        adx = ta.adx(df['High'], df['Low'], df['Close'], length=14)
+        tr = ta.true_range(df['High'], df['Low'], df['Close'])
+        expected = {
+            'tr': tr, 'atr_sma': ta.sma(tr, length=14), 'atr': ta.atr(df['High'], df['Low'], df['Close'], length=14),
+            'rsi': ta.rsi(df['Close'], length=14), 'mfi': ta.mfi(df['High'], df['Low'], df['Close'], df['Volume'], length=14),
+            'dmp': adx['DMP_14'], 'dmn': adx['DMN_14'], 'adx': adx['ADX_14'], 'sma200': df['Close'].rolling(200).mean(),
+        }
+        for name, series in expected.items():
+            assert np.allclose(bundle[name], series, equal_nan=True), f"{ticker}: bundle {name} mismatch"
+
+        fast = calculate_alphatrend(df)
+        upt = fast['Low'] - fast['atr']
+        downT = fast['High'] + fast['atr']
+        ref = pd.Series(_alphatrend_reference(fast['mfi'], upt, downT), index=fast.index)
+        assert np.allclose(fast['At_k1'], ref, equal_nan=True), f"{ticker}: kernel mismatch"
+
+    if frames:
+        panel = {f: pd.DataFrame({t: df[f] for t, df in frames.items()}) for f in ['High', 'Low', 'Close', 'Volume']}
+        start_time = time.time()
+        out = calculate_alphatrend_panel(panel['High'], panel['Low'], panel['Close'], panel['Volume'])
+        elapsed = (time.time() - start_time) * 1000
+        for ticker, df in frames.items():
+            single = calculate_alphatrend(df.dropna(subset=['Close']))
+            assert np.allclose(out['At_k1'][ticker].dropna(), single['At_k1'].dropna()), f"{ticker}: panel mismatch"
+        print(f"✅ Indicator bundle and AlphaTrend parity OK on {len(frames)} tickers (panel: {elapsed:.1f} ms).")
+    else:
+        print("AlphaTrend logic loaded.")
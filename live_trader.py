@@ -2,7 +2,7 @@ import os
 import pandas as pd
 import numpy as np
 from alpaca.trading.client import TradingClient
-from alpaca.data.historical import StockHistoricalDataClient
+from alpaca_cache import CachedStockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
@@ -19,7 +19,7 @@ class AlphaAccumulator:
         self.secret_key = os.getenv("ALPACA_SECRET_KEY")
         
         self.trading_client = TradingClient(self.api_key, self.secret_key, paper=paper)
-        self.data_client = StockHistoricalDataClient(self.api_key, self.secret_key)
+        self.data_client = CachedStockHistoricalDataClient(self.api_key, self.secret_key)
         
         self.universe_path = "stock-bot/data/sp500_tickers.csv"
 
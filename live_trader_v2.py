@@ -2,15 +2,15 @@ import os
 import pandas as pd
 import numpy as np
 from alpaca.trading.client import TradingClient
-from alpaca.data.historical import StockHistoricalDataClient
+from alpaca_cache import CachedStockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import pandas_ta as ta
 
 # Import our verified indicators
-from indicators import calculate_alphatrend, calculate_bb_rsi
+from indicators import calculate_alphatrend, calculate_bb_rsi, calculate_indicator_bundle
+from sync_data import sync_hourly_data, load_bars
 
 class AlphaAccumulatorV2:
     def __init__(self, paper=True):
@@ -19,7 +19,7 @@ class AlphaAccumulatorV2:
         self.secret_key = os.getenv("ALPACA_SECRET_KEY")
         
         self.trading_client = TradingClient(self.api_key, self.secret_key, paper=paper)
-        self.data_client = StockHistoricalDataClient(self.api_key, self.secret_key)
+        self.data_client = CachedStockHistoricalDataClient(self.api_key, self.secret_key)
         
         # We focus on the "Alpha Vehicles" identified in backtests
         self.watchlist = ["NVDA", "TSLA", "AMD", "META", "NFLX", "AMZN", "MSFT", "GOOGL", "AVGO", "SMCI", "ARM", "PLTR", "QCOM", "AAPL"]
@@ -34,34 +34,45 @@ class AlphaAccumulatorV2:
         
         print(f"Starting 10-Point Alpha Scan on {len(self.watchlist)} tickers...")
         
+        # 4-Hour "Swing Sweet Spot" bars, materialized in the local warehouse from synced hourly bars
+        frames = {}
         try:
-            request_params = StockBarsRequest(
-                symbol_or_symbols=self.watchlist,
-                timeframe=TimeFrame.Hour, # Fetch hour, then resample to 4H
-                start=start_date,
-                adjustment='all'
-            )
-            bars = self.data_client.get_stock_bars(request_params).df
-            
-            for ticker in self.watchlist:
-                try:
+            sync_hourly_data(self.watchlist)
+            frames = load_bars(self.watchlist, table="bars_4h", start=start_date)
+        except Exception as e:
+            print(f"⚠️ Local warehouse unavailable ({e}). Falling back to the API.")
+        missing = [t for t in self.watchlist if t not in frames]
+        
+        try:
+            if missing:
+                request_params = StockBarsRequest(
+                    symbol_or_symbols=missing,
+                    timeframe=TimeFrame.Hour, # Fetch hour, then resample to 4H
+                    start=start_date,
+                    adjustment='all'
+                )
+                bars = self.data_client.get_stock_bars(request_params).df
+                for ticker in missing:
                     if ticker not in bars.index.get_level_values(0):
                         continue
-                    
                     df_hour = bars.xs(ticker).copy()
                     df_hour.columns = [col.capitalize() for col in df_hour.columns]
-                    
-                    # Resample to 4-Hour "Swing Sweet Spot"
-                    df = df_hour.resample('4h').agg({
+                    frames[ticker] = df_hour.resample('4h').agg({
                         'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'
                     }).dropna()
+            
+            for ticker in self.watchlist:
+                try:
+                    if ticker not in frames:
+                        continue
                     
+                    df = frames[ticker]
                     if len(df) < 200: continue
                     
                     # 1. Calculate Indicators
-                    df['Sma200'] = df['Close'].rolling(200).mean()
-                    df = calculate_alphatrend(df)
-                    df['rsi'] = ta.rsi(df['Close'], length=14)
+                    bundle = calculate_indicator_bundle(df)
+                    df = calculate_alphatrend(df, bundle=bundle)
+                    df['Sma200'] = bundle['sma200']
                     
                     last = df.iloc[-1]
                     prev = df.iloc[-2]
@@ -0,0 +1,219 @@
+import pandas as pd
+from alpaca.data.requests import StockBarsRequest
+from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
+
+import sync_data
+
+# Read-through access to the DuckDB warehouse for the backtest scripts.
+# Bars already in the warehouse are read locally; only the parts of a request that fall outside what
+# was stored (or previously asked of the API) are fetched, merged into the warehouse, and then served.
+# Both are kept as separate intervals per symbol, so a hole between two fetched ranges is still filled.
+
+# (timeframe unit, adjustment) -> warehouse table. Anything else is passed straight to the API.
+TABLES = {
+    (TimeFrameUnit.Day, 'all'): "bars",
+    (TimeFrameUnit.Hour, 'all'): sync_data.HOURLY_TABLE,
+}
+SESSION_TZ = "America/New_York"
+# Hours (New York, weekdays) between which each table's bars settle: daily bars at the regular close,
+# hourly bars (extended hours, 4:00 - 20:00) at the end of every hour in the session
+SETTLE_HOURS = {"bars": (16, 16), sync_data.HOURLY_TABLE: (5, 20)}
+
+def _utc(value):
+    """Naive datetimes are taken as UTC, like the Alpaca client does."""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+def _merge(intervals):
+    """Sorted union of (from, to) intervals; only ranges that overlap or touch are joined."""
+    merged = []
+    for lo, hi in sorted(intervals):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+def _bar_open(table, ts):
+    """Opening timestamp of the `table` bar holding ts (a daily bar opens at midnight New York)."""
+    if table == "bars":
+        return ts.tz_convert(SESSION_TZ).normalize().tz_convert('UTC')
+    return ts.floor('h')
+
+def _next_settle(table, ts):
+    """
+    First time after ts at which a `table` bar that wasn't complete at ts has settled. Weekends are skipped;
+    exchange holidays aren't, they only cost one empty fetch.
+    """
+    first, last = SETTLE_HOURS[table]
+    local = ts.tz_convert(SESSION_TZ)
+    day = local.normalize()
+    due = max(local.floor('h') + pd.Timedelta(hours=1), day + pd.Timedelta(hours=first))
+    if due > day + pd.Timedelta(hours=last) or day.weekday() >= 5:
+        due = day + pd.offsets.BDay(1) + pd.Timedelta(hours=first)
+    return due.tz_convert('UTC')
+
+class MarketDataRepository:
+    """
+    Serves (symbols, timeframe, start, end, adjustment) bar requests from the warehouse,
+    fetching only the missing ranges of each symbol from Alpaca. Cheap to build: requests read the
+    published snapshot, and only filling a missing range takes the writer lock.
+    """
+
+    def __init__(self, batch_size=100):
+        self.batch_size = batch_size
+        self.bucket = sync_data.TokenBucket(sync_data.RATE_LIMIT_PER_MIN / 60, capacity=sync_data.MAX_IN_FLIGHT)
+
+    def _fetch(self, symbols, timeframe, start, end, adjustment):
+        def make_request(batch):
+            return StockBarsRequest(
+                symbol_or_symbols=batch,
+                timeframe=timeframe,
+                start=start,
+                end=end,
+                adjustment=adjustment
+            )
+        rejected = []
+        bars = sync_data.fetch_batch(symbols, make_request, self.bucket, rejected)
+        if rejected:
+            sync_data.update_quarantine(rejected)
+        return bars
+
+    def _coverage(self, conn, table, symbols):
+        """
+        {symbol: [(covered_from, covered_to), ...]} merged: the stored bars (split at the coverage index's
+        gaps) plus ranges already asked of the API.
+        """
+        ts = "{}::TIMESTAMPTZ" if table == "bars" else "timezone('UTC', {})"
+        rows = conn.execute(f"""
+            WITH spans AS (
+                SELECT symbol,
+                       UNNEST(list_prepend(first_ts, list_transform(gaps, g -> g.to_ts))) AS lo,
+                       UNNEST(list_append(list_transform(gaps, g -> g.from_ts), last_ts)) AS hi
+                FROM coverage WHERE timeframe = $timeframe AND symbol IN (SELECT UNNEST($symbols))
+            )
+            SELECT symbol, {ts.format('lo')}, {ts.format('hi')} FROM spans
+            UNION ALL
+            SELECT symbol, covered_from, covered_to
+            FROM fetched_ranges WHERE table_name = $table AND symbol IN (SELECT UNNEST($symbols))
+        """, {'symbols': list(symbols), 'table': table, 'timeframe': sync_data.TIMEFRAMES[table]}).fetchall()
+        intervals = {}
+        for symbol, lo, hi in rows:
+            intervals.setdefault(symbol, []).append((_utc(lo), _utc(hi)))
+        return {symbol: _merge(spans) for symbol, spans in intervals.items()}
+
+    def _gaps(self, table, symbols, coverage, start, end):
+        """
+        Groups the missing (start, end) ranges into API requests of up to batch_size symbols. Holes inside
+        the request are always missing; the tail after the last covered point only once a bar beyond it has
+        settled, and then from the open of the bar it ends in, so a bar stored while still forming is replaced.
+        """
+        now = pd.Timestamp.now(tz='UTC')
+        gaps = {}
+        for symbol in symbols:
+            cursor, known = start, False
+            for lo, hi in coverage.get(symbol, []):
+                if hi < cursor:
+                    continue
+                if lo >= end:
+                    break
+                if lo > cursor:
+                    gaps.setdefault((cursor, lo), []).append(symbol)
+                cursor, known = max(cursor, hi), True
+            if cursor >= end:
+                continue
+            if not known:
+                gaps.setdefault((start, end), []).append(symbol)
+            elif _next_settle(table, cursor) <= min(end, now):
+                gaps.setdefault((max(start, _bar_open(table, cursor)), end), []).append(symbol)
+        return [
+            (group[i:i + self.batch_size], gap_start, gap_end)
+            for (gap_start, gap_end), group in gaps.items()
+            for i in range(0, len(group), self.batch_size)
+        ]
+
+    def _fill(self, table, requests, timeframe, adjustment):
+        """
+        Fetches the gap requests, merges them into the warehouse and records the ranges as covered.
+        The only writer path here, so it is also where the schema gets created; one snapshot publish at the end.
+        """
+        with sync_data.writer_lock():
+            sync_data.init_db()
+            with sync_data.connect_writer() as conn:
+                sync_data.create_staging(conn)
+                for symbols, gap_start, gap_end in requests:
+                    sync_data.stage_bars(conn, self._fetch(symbols, timeframe, gap_start, gap_end, adjustment))
+                inserted = sync_data.merge_staged(conn, table)
+                # Only recorded once the bars are in, so a failed fetch is retried next time
+                self._record_fetched(conn, table, requests)
+        return inserted
+
+    def _record_fetched(self, conn, table, requests):
+        """Adds the requested ranges (up to now at most) to fetched_ranges, re-merged per symbol."""
+        now = pd.Timestamp.now(tz='UTC')
+        symbols = sorted({symbol for group, _, _ in requests for symbol in group})
+        params = {'table': table, 'symbols': symbols}
+        intervals = {}
+        for symbol, lo, hi in conn.execute("""
+            SELECT symbol, covered_from, covered_to FROM fetched_ranges
+            WHERE table_name = $table AND symbol IN (SELECT UNNEST($symbols))
+        """, params).fetchall():
+            intervals.setdefault(symbol, []).append((_utc(lo), _utc(hi)))
+        for group, gap_start, gap_end in requests:
+            for symbol in group:
+                intervals.setdefault(symbol, []).append((gap_start, min(gap_end, now)))
+        rows = pd.DataFrame(
+            [(table, symbol, lo, hi) for symbol, spans in intervals.items() for lo, hi in _merge(spans)],
+            columns=['table_name', 'symbol', 'covered_from', 'covered_to'],
+        )
+        conn.register("range_rows", rows)
+        conn.begin()
+        try:
+            conn.execute("DELETE FROM fetched_ranges WHERE table_name = $table AND symbol IN (SELECT UNNEST($symbols))", params)
+            conn.execute("INSERT INTO fetched_ranges SELECT * FROM range_rows")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.unregister("range_rows")
+
+    def get_bars(self, symbols, timeframe=TimeFrame.Day, start=None, end=None, adjustment='all'):
+        """
+        Bars as {symbol: DataFrame}, capitalized columns on a UTC index, like bars.xs(symbol) from the API.
+        start defaults to 5 years back, end to now.
+        """
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        end = _utc(end) if end is not None else pd.Timestamp.now(tz='UTC')
+        start = _utc(start) if start is not None else end - pd.Timedelta(days=365 * 5)
+
+        table = TABLES.get((timeframe.unit, adjustment)) if timeframe.amount == 1 else None
+        if table is None:
+            # Not warehoused: plain API pass-through
+            return sync_data.bars_to_frames(self._fetch(symbols, timeframe, start, end, adjustment))
+
+        conn = sync_data.connect_reader()
+        requests = self._gaps(table, symbols, self._coverage(conn, table, symbols), start, end)
+        if requests:
+            conn.close()
+            print(f"📡 Fetching {len(requests)} missing range(s) for {table}...")
+            self._fill(table, requests, timeframe, adjustment)
+            # The fill published a new snapshot
+            conn = sync_data.connect_reader()
+        frames = sync_data.load_bars(symbols, table=table, start=start, end=end, conn=conn)
+        conn.close()
+        return frames
+
+    def get_panel(self, symbols, timeframe=TimeFrame.Day, start=None, end=None, adjustment='all'):
+        """The same bars as (bars x symbols) DataFrames, one per capitalized field."""
+        frames = self.get_bars(symbols, timeframe, start, end, adjustment)
+        fields = ['Open', 'High', 'Low', 'Close', 'Volume']
+        return {f: pd.DataFrame({symbol: df[f] for symbol, df in frames.items()}) for f in fields}
+
+if __name__ == "__main__":
+    import time
+    repo = MarketDataRepository()
+    for attempt in ("cold", "warm"):
+        start_time = time.time()
+        frames = repo.get_bars(["SPY", "QQQ", "AAPL"])
+        print(f"⏱️ {attempt}: {sum(len(df) for df in frames.values())} bars in {time.time() - start_time:.2f}s")
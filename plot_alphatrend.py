@@ -3,33 +3,17 @@ import pandas as pd
 import pandas_ta as ta
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest
-from alpaca.data.timeframe import TimeFrame
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 from indicators import calculate_alphatrend
+from market_data import MarketDataRepository
 
-# Load credentials
-load_dotenv("stock-bot/.env")
-API_KEY = os.getenv("ALPACA_API_KEY")
-API_SECRET = os.getenv("ALPACA_SECRET_KEY")
-
-client = StockHistoricalDataClient(API_KEY, API_SECRET)
+repo = MarketDataRepository()
 
 def plot_alphatrend(ticker="MSFT"):
     print(f"Fetching data for {ticker}...")
     start_date = datetime.now() - timedelta(days=120)
     
-    request_params = StockBarsRequest(
-        symbol_or_symbols=ticker,
-        timeframe=TimeFrame.Day,
-        start=start_date,
-        adjustment='all'
-    )
-    bars = client.get_stock_bars(request_params).df
-    df = bars.xs(ticker).copy()
-    df.columns = [col.capitalize() for col in df.columns]
+    df = repo.get_bars(ticker, start=start_date)[ticker]
     
     print(f"Calculating AlphaTrend for {ticker}...")
     df = calculate_alphatrend(df)
@@ -2,22 +2,26 @@ import os
 import pandas as pd
 import numpy as np
 import asyncio
+from collections import deque
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 from alpaca.trading.client import TradingClient
-from alpaca.data.historical import StockHistoricalDataClient
+from alpaca_cache import CachedStockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from alpaca.trading.requests import LimitOrderRequest, MarketOrderRequest
 from alpaca.trading.enums import OrderSide, TimeInForce
 
-import pandas_ta as ta
 from indicators import calculate_alphatrend
-from rsi_alpha import find_bullish_divergence, check_rsi_support_bounce
+from streaming_indicators import RollingSMA, WilderRSI, ATR, ADX, AlphaTrend
+from rsi_alpha import DivergenceTracker, check_rsi_support_bounce
 from trend_alpha import calculate_trend_quality
 from visualizer import generate_trade_card
 from logger_alpha import log_trade_entry, log_trade_exit, get_recent_exits
+from sync_data import HOURLY_TABLE, sync_hourly_data, load_bars
+
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
 # Notification hook placeholder
 
 class AlphaPredator:
@@ -27,7 +31,7 @@ class AlphaPredator:
         self.secret_key = os.getenv("ALPACA_SECRET_KEY")
         
         self.trading_client = TradingClient(self.api_key, self.secret_key, paper=paper)
-        self.data_client = StockHistoricalDataClient(self.api_key, self.secret_key)
+        self.data_client = CachedStockHistoricalDataClient(self.api_key, self.secret_key)
         
         # Load watchlist from weekly candidates if available, otherwise fallback
         self.watchlist = self.load_watchlist()
@@ -39,6 +43,7 @@ class AlphaPredator:
         }
         
         self.data_cache = {} 
+        self.indicator_state = {}
         self.last_sync = None
 
     def load_watchlist(self):
@@ -55,24 +60,33 @@ class AlphaPredator:
         return ["NVDA", "TSLA", "AMD", "META", "NFLX", "AMZN", "MSFT", "GOOGL", "AVGO", "SMCI", "ARM", "PLTR", "QCOM", "AAPL"]
 
     async def initialize_data(self):
-        """Fetch last 100 days to prime the cache."""
+        """Prime the cache with the last 100 days of hourly bars from the local warehouse."""
         print("📥 Priming Predator Data Cache...")
         start_date = datetime.now() - timedelta(days=100)
         all_tickers = self.watchlist + [self.benchmark]
         
-        request_params = StockBarsRequest(
-            symbol_or_symbols=all_tickers,
-            timeframe=TimeFrame.Hour,
-            start=start_date,
-            adjustment='all'
-        )
-        bars = self.data_client.get_stock_bars(request_params).df
+        try:
+            # Incremental: only hours newer than the warehouse are fetched from the API
+            sync_hourly_data(all_tickers)
+            self.data_cache = load_bars(all_tickers, table=HOURLY_TABLE, start=start_date)
+        except Exception as e:
+            print(f"⚠️ Local warehouse unavailable ({e}). Priming from the API.")
         
-        for ticker in all_tickers:
-            if ticker in bars.index.get_level_values(0):
-                df = bars.xs(ticker).copy()
-                df.columns = [c.capitalize() for c in df.columns]
-                self.data_cache[ticker] = df
+        missing = [t for t in all_tickers if t not in self.data_cache]
+        if missing:
+            request_params = StockBarsRequest(
+                symbol_or_symbols=missing,
+                timeframe=TimeFrame.Hour,
+                start=start_date,
+                adjustment='all'
+            )
+            bars = self.data_client.get_stock_bars(request_params).df
+            
+            for ticker in missing:
+                if ticker in bars.index.get_level_values(0):
+                    df = bars.xs(ticker).copy()
+                    df.columns = [c.capitalize() for c in df.columns]
+                    self.data_cache[ticker] = df
         
         self.last_sync = datetime.now()
         print("✅ Cache Primed.")
@@ -94,8 +108,99 @@ class AlphaPredator:
             if ticker in bars.index.get_level_values(0):
                 new_df = bars.xs(ticker).copy()
                 new_df.columns = [c.capitalize() for c in new_df.columns]
-                # Combine and drop duplicates to keep cache fresh
-                self.data_cache[ticker] = pd.concat([self.data_cache[ticker], new_df]).drop_duplicates().tail(1000)
+                # One row per hour: a bar fetched again (still forming before, or revised) replaces the cached one
+                combined = pd.concat([self.data_cache[ticker], new_df])
+                combined = combined[~combined.index.duplicated(keep='last')].sort_index()
+                self.data_cache[ticker] = combined.tail(1000)
+
+    @staticmethod
+    def _snapshot_state(state):
+        return {
+            'last_ts': state['last_ts'],
+            'indicators': {name: ind.snapshot() for name, ind in state['indicators'].items()},
+            'rsi_tail': list(state['rsi_tail']),
+            'divergence': state['divergence'].snapshot(),
+        }
+
+    @staticmethod
+    def _restore_state(state, saved):
+        state['last_ts'] = saved['last_ts']
+        for name, ind in state['indicators'].items():
+            ind.restore(saved['indicators'][name])
+        state['rsi_tail'] = deque(saved['rsi_tail'], maxlen=state['rsi_tail'].maxlen)
+        state['divergence'].restore(saved['divergence'])
+
+    def update_indicator_state(self, ticker, df):
+        """
+        Feeds newly closed 4H bars into the ticker's streaming indicators (O(1) per new bar). If the last
+        committed bar has changed since (a late or revised hourly bar in its bucket), the state is rolled back
+        to before it and the bar is fed again.
+        """
+        state = self.indicator_state.get(ticker)
+        if state is None:
+            state = self.indicator_state[ticker] = {
+                'last_ts': None,
+                'last_bar': None,
+                'before_last': None,
+                'indicators': {
+                    'sma200': RollingSMA(200),
+                    'at': AlphaTrend(),
+                    'rsi': WilderRSI(14),
+                    'atr': ATR(14),
+                    'adx': ADX(14),
+                },
+                'rsi_tail': deque(maxlen=50),
+                'divergence': DivergenceTracker(),
+            }
+        
+        # The last 4H bar is still forming, so only the ones before it are committed
+        closed = df.iloc[:-1]
+        last_ts = state['last_ts']
+        if last_ts in closed.index and tuple(closed.loc[last_ts, OHLCV]) != state['last_bar']:
+            self._restore_state(state, state['before_last'])
+        if state['last_ts'] is not None:
+            closed = closed[closed.index > state['last_ts']]
+        for i, (ts, bar) in enumerate(closed.iterrows()):
+            if i == len(closed) - 1:
+                state['before_last'] = self._snapshot_state(state)
+                state['last_bar'] = tuple(bar[OHLCV])
+            for ind in state['indicators'].values():
+                ind.update(bar)
+            state['rsi_tail'].append(state['indicators']['rsi'].value)
+            state['divergence'].update(bar['Close'], state['indicators']['rsi'].value)
+            state['last_ts'] = ts
+        return state
+
+    def live_indicators(self, ticker, df):
+        """Indicator values including the forming bar, previewed without committing it."""
+        state = self.update_indicator_state(ticker, df)
+        indicators = state['indicators']
+        saved = {name: ind.snapshot() for name, ind in indicators.items()}
+        saved_divergence = state['divergence'].snapshot()
+        at = indicators['at']
+        prev_k1, prev_k2 = at.k1, at.k2
+        
+        bar = df.iloc[-1]
+        for ind in indicators.values():
+            ind.update(bar)
+        state['divergence'].update(bar['Close'], indicators['rsi'].value)
+        values = {
+            'sma200': indicators['sma200'].value,
+            'at_k1': at.k1,
+            'at_k2': at.k2,
+            'prev_at_k1': prev_k1,
+            'prev_at_k2': prev_k2,
+            'rsi': indicators['rsi'].value,
+            'rsi_series': pd.Series(list(state['rsi_tail']) + [indicators['rsi'].value]),
+            'atr': indicators['atr'].value,
+            'adx': indicators['adx'].value,
+            'divergence': state['divergence'].value,
+        }
+        
+        for name, ind in indicators.items():
+            ind.restore(saved[name])
+        state['divergence'].restore(saved_divergence)
+        return values
 
     def calculate_predator_score(self, ticker):
         if ticker not in self.data_cache or self.benchmark not in self.data_cache:
@@ -108,10 +213,7 @@ class AlphaPredator:
         
         if len(df) < 200: return 0, [], 0, 0
         
-        df['Sma200'] = df['Close'].rolling(200).mean()
-        df = calculate_alphatrend(df)
-        df['rsi'] = ta.rsi(df['Close'], length=14)
-        df['atr'] = ta.atr(df['High'], df['Low'], df['Close'], length=14)
+        live = self.live_indicators(ticker, df)
         
         last = df.iloc[-1]
         prev = df.iloc[-2]
@@ -119,23 +221,23 @@ class AlphaPredator:
         score = 0
         signals = []
         
-        if last['Close'] > last['Sma200']:
+        if last['Close'] > live['sma200']:
             score += 2
             signals.append("Macro Bullish")
         
-        is_at_bullish = last['At_k1'] > last['At_k2']
+        is_at_bullish = live['at_k1'] > live['at_k2']
         if is_at_bullish:
             score += 3
             signals.append("AlphaTrend Bullish")
             
-        if is_at_bullish and (prev['At_k1'] <= prev['At_k2']):
+        if is_at_bullish and (live['prev_at_k1'] <= live['prev_at_k2']):
             score += 2
             signals.append("JUST CROSSED")
         
-        if last['rsi'] < 35:
+        if live['rsi'] < 35:
             score += 2
             signals.append("Deep Dip")
-        elif last['rsi'] < 45:
+        elif live['rsi'] < 45:
             score += 1
             signals.append("Moderate Dip")
             
@@ -144,16 +246,16 @@ class AlphaPredator:
             signals.append("Breakout")
 
         # RSI Alpha Logic
-        if find_bullish_divergence(df['Close'], df['rsi']):
+        if live['divergence']:
             score += 4
             signals.append("Bullish Divergence (Elite)")
         
-        if check_rsi_support_bounce(df['rsi']):
+        if check_rsi_support_bounce(live['rsi_series']):
             score += 2
             signals.append("RSI 40 Bounce")
 
         # Trend Quality Integration
-        t_score, t_signals, adx, r2, slope = calculate_trend_quality(df)
+        t_score, t_signals, adx, r2, slope = calculate_trend_quality(df, adx=live['adx'])
         score += t_score
         signals.extend(t_signals)
 
@@ -179,7 +281,7 @@ class AlphaPredator:
                 score += 1
                 signals.append(f"{sector} Tailwind")
 
-        return score, signals, last['Close'], last['atr']
+        return score, signals, last['Close'], live['atr']
 
     async def execution_loop(self):
         print("🚀 PREDATOR ENGINE LIVE. Watching for Alpha...")
@@ -0,0 +1,222 @@
+import pandas as pd
+import numpy as np
+
+from indicators import calculate_alphatrend_panel
+from rsi_alpha import divergence_panel
+from trend_alpha import rolling_linregress
+
+# Vectorized, full-history version of AlphaPredator.calculate_predator_score.
+# Every input is a (bars x symbols) DataFrame on one shared index (e.g. 4H bars from the warehouse),
+# and every output is a DataFrame of the same shape, so the live entry rule can be backtested as written.
+
+def _rma(df, length):
+    """pandas_ta rma, column by column."""
+    return df.ewm(alpha=1.0 / length, min_periods=length).mean()
+
+def _true_range(high, low, close):
+    """ta.true_range per column; the first bar of each symbol has no previous close."""
+    prev_close = close.shift(1)
+    tr = np.fmax(high - low, np.fmax((high - prev_close).abs(), (prev_close - low).abs()))
+    return tr.where(prev_close.notna())
+
+def _rsi(close, length=14):
+    change = close.diff()
+    gain = _rma(change.clip(lower=0), length)
+    loss = _rma((-change).clip(lower=0), length)
+    return 100 * gain / (gain + loss)
+
+def _adx(high, low, close, length=14):
+    atr = _rma(_true_range(high, low, close), length)
+    up = high.diff()
+    down = -low.diff()
+    pos = up.where((up > down) & (up > 0), 0.0).where(up.notna())
+    neg = down.where((down > up) & (down > 0), 0.0).where(down.notna())
+    k = 100 / atr
+    dmp = k * _rma(pos, length)
+    dmn = k * _rma(neg, length)
+    dx = 100 * (dmp - dmn).abs() / (dmp + dmn)
+    return _rma(dx, length)
+
+def _bars_seen(close):
+    """Number of bars each symbol has had up to (and including) each row."""
+    return close.notna().cumsum()
+
+def calculate_predator_scorecard(high, low, close, volume, benchmark_close, sectors=None, window=20):
+    """
+    Scores every bar of every symbol with the 12-point Predator scorecard.
+
+    Args:
+        high, low, close, volume (pd.DataFrame): (bars x symbols) panels.
+        benchmark_close (pd.Series): Benchmark (SPY) closes, on its own bars.
+        sectors (dict): Sector name -> list of tickers, as in AlphaPredator.sectors.
+
+    Returns:
+        dict: 'score' plus one DataFrame per component flag, and 'atr' for the bracket.
+    """
+    sectors = sectors or {}
+    bars_seen = _bars_seen(close)
+    prev_close_4 = close.shift(4)
+
+    card = {}
+    # 1. Macro (+2)
+    card['macro'] = close > close.rolling(200).mean()
+
+    # 2. AlphaTrend (+3) and JUST CROSSED (+2)
+    at = calculate_alphatrend_panel(high, low, close, volume)
+    card['at_bullish'] = at['At_k1'] > at['At_k2']
+    card['just_crossed'] = card['at_bullish'] & (at['At_k1'].shift(1) <= at['At_k2'].shift(1))
+
+    # 3. Dip tiers (+2 / +1) and Breakout (+1)
+    rsi = _rsi(close, 14)
+    card['deep_dip'] = rsi < 35
+    card['moderate_dip'] = (rsi >= 35) & (rsi < 45)
+    card['breakout'] = close > high.shift(1)
+
+    # 4. RSI Alpha: Bullish Divergence (+4) and RSI 40 Bounce (+2)
+    card['divergence'] = divergence_panel(close, rsi)
+    card['rsi_bounce'] = ((rsi.shift(1) - 40).abs() <= 2) & (rsi > rsi.shift(1))
+
+    # 5. Trend Quality (ADX / R-Squared / Slope), only once window + 14 bars exist
+    adx = _adx(high, low, close, 14)
+    slope, r_squared, slope_prev = rolling_linregress(close, window=window, lag=5)
+    slope_prev = slope_prev.where(slope_prev.notna(), slope)
+    norm_slope = slope / close * 100
+    has_history = bars_seen >= window + 14
+    trend_score = (
+        2 * (adx > 25).astype(int)
+        + 2 * (r_squared > 0.7).astype(int)
+        + 1 * ((r_squared > 0.5) & (r_squared <= 0.7)).astype(int)
+        + np.where(norm_slope > 0.1, np.where(slope > slope_prev, 2, 1), 0)
+        - 2 * (norm_slope > 1.5).astype(int)
+    )
+    card['trend_score'] = trend_score.where(has_history, 0)
+
+    # 6. Relative Strength vs. benchmark (+1), 4-bar performance
+    stock_perf = close / prev_close_4 - 1
+    spy_perf = (benchmark_close / benchmark_close.shift(4) - 1).reindex(close.index, method='ffill')
+    card['relative_strength'] = stock_perf.gt(spy_perf, axis=0)
+
+    # 7. Sector Tailwind (+1): at least two *other* peers above their SMA50
+    peer_bullish = (close > close.rolling(50).mean()).astype(int)
+    tailwind = pd.DataFrame(False, index=close.index, columns=close.columns)
+    assigned = set()
+    for sector, tickers in sectors.items():
+        peers = [t for t in tickers if t in close.columns]
+        bullish_count = peer_bullish[peers].sum(axis=1)
+        for ticker in peers:
+            # Like the engine, a ticker only counts its first listed sector
+            if ticker in assigned:
+                continue
+            assigned.add(ticker)
+            tailwind[ticker] = (bullish_count - peer_bullish[ticker]) >= 2
+    card['sector_tailwind'] = tailwind
+
+    score = (
+        2 * card['macro'].astype(int)
+        + 3 * card['at_bullish'].astype(int)
+        + 2 * card['just_crossed'].astype(int)
+        + 2 * card['deep_dip'].astype(int)
+        + 1 * card['moderate_dip'].astype(int)
+        + 1 * card['breakout'].astype(int)
+        + 4 * card['divergence'].astype(int)
+        + 2 * card['rsi_bounce'].astype(int)
+        + card['trend_score']
+        + 1 * card['relative_strength'].astype(int)
+        + 1 * card['sector_tailwind'].astype(int)
+    )
+    # The live engine does not score a ticker until it has 200 bars
+    card['score'] = score.where(bars_seen >= 200, 0)
+    card['atr'] = _rma(_true_range(high, low, close), 14)
+    return card
+
+def scorecard_signals(card, close, threshold=9, stop_atr=2.5, target_atr=7.5):
+    """
+    Turns a scorecard into vbt.Portfolio.from_signals keyword arguments:
+    enter at score >= threshold, exit on AlphaTrend breakdown, ATR bracket as fractional stops.
+    """
+    return {
+        'close': close,
+        'entries': card['score'] >= threshold,
+        'exits': ~card['at_bullish'],
+        'sl_stop': (stop_atr * card['atr'] / close).fillna(np.inf),
+        'tp_stop': (target_atr * card['atr'] / close).fillna(np.inf),
+    }
+
+def _parity_with_engine(n_days=200, checked_bars=60):
+    """
+    Scores a synthetic hourly universe with staggered listings bar by bar through AlphaPredator
+    .calculate_predator_score, as the live loop sees it, and checks every score against the panel scorecard.
+    """
+    from predator_engine import AlphaPredator
+
+    rng = np.random.default_rng(11)
+    hours = pd.DatetimeIndex([ts for day in pd.bdate_range("2025-01-02", periods=n_days)
+                              for ts in pd.date_range(day + pd.Timedelta(hours=12), periods=8, freq="h")])
+    listed = {"SPY": 0, "NVDA": 0, "AMD": 0, "AAPL": 0, "AVGO": 30, "MSFT": 60}  # listing day
+    hourly = {}
+    for ticker, day in listed.items():
+        index = hours[day * 8:]
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.008, len(index))))
+        spread = close * rng.uniform(0.001, 0.01, len(index))
+        hourly[ticker] = pd.DataFrame({
+            'Open': close + rng.normal(0, 0.3, len(index)) * spread, 'High': close + spread,
+            'Low': close - spread, 'Close': close, 'Volume': rng.integers(1e5, 1e6, len(index)).astype(float),
+        }, index=index)
+
+    engine = AlphaPredator()
+    frames = {t: df.resample('4h').agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}).dropna()
+              for t, df in hourly.items()}
+    panel = {f: pd.DataFrame({t: df[f] for t, df in frames.items()}) for f in ['High', 'Low', 'Close', 'Volume']}
+    card = calculate_predator_scorecard(panel['High'], panel['Low'], panel['Close'], panel['Volume'],
+                                        benchmark_close=panel['Close']['SPY'], sectors=engine.sectors)
+
+    checked = 0
+    for ts in panel['Close'].index[-checked_bars:]:
+        # The cache holds hourly bars up to the end of this 4H bar, which is the engine's forming bar
+        engine.data_cache = {t: df[df.index < ts + pd.Timedelta(hours=4)] for t, df in hourly.items()}
+        for ticker in listed:
+            if ticker == "SPY":
+                continue
+            score = engine.calculate_predator_score(ticker)[0]
+            assert score == card['score'].loc[ts, ticker], (ts, ticker, score, card['score'].loc[ts, ticker])
+            checked += 1
+    late = {t: int(card['trend_score'][t].gt(0).sum()) for t in ("AVGO", "MSFT")}
+    print(f"✅ Scorecard matches the engine on {checked} bar scores (trend-quality bars for late listings: {late}).")
+
+    # A revised hourly bar inside the last committed 4H bar: the streaming state must match a fresh engine's
+    cache = engine.data_cache["NVDA"].copy()
+    committed = frames["NVDA"].index[frames["NVDA"].index < cache.index[-1].floor('4h')][-1]
+    cache.loc[cache.index[cache.index >= committed][0], ['Close', 'High']] *= 1.05
+    fresh = AlphaPredator()
+    for bot in (engine, fresh):
+        bot.data_cache["NVDA"] = cache
+    agg = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    df = cache.resample('4h').agg(agg).dropna()
+    revised, expected = engine.live_indicators("NVDA", df), fresh.live_indicators("NVDA", df)
+    for name, value in expected.items():
+        assert np.allclose(revised[name], value, equal_nan=True), (name, revised[name], value)
+    print(f"✅ A revised bar at {committed} is re-fed into the streaming state.")
+
+if __name__ == "__main__":
+    import glob
+    import os
+    import vectorbt as vbt
+
+    _parity_with_engine()
+
+    frames = {}
+    for path in sorted(glob.glob("stock-bot/data/*_1Day.csv")):
+        frames[os.path.basename(path).replace("_1Day.csv", "")] = pd.read_csv(path, parse_dates=True, index_col=0)
+    panel = {f: pd.DataFrame({t: df[f] for t, df in frames.items()}) for f in ['High', 'Low', 'Close', 'Volume']}
+
+    card = calculate_predator_scorecard(
+        panel['High'], panel['Low'], panel['Close'], panel['Volume'],
+        benchmark_close=panel['Close']['SPY'],
+        sectors={"SEMIS": ["NVDA", "AMD"], "BIG_TECH": ["AAPL", "MSFT"]}
+    )
+    pf = vbt.Portfolio.from_signals(**scorecard_signals(card, panel['Close']), init_cash=10000, fees=0.001, freq='1D')
+    print(pd.DataFrame({
+        "Return %": (pf.total_return() * 100).round(1),
+        "Trades": pf.trades.count(),
+        "Max Score": card['score'].max(),
+    }).to_markdown())
@@ -1,7 +1,12 @@
+from collections import deque
+
 import pandas as pd
 import numpy as np
+from numba import njit
 from scipy.signal import argrelextrema
 
+from streaming_indicators import StreamingIndicator
+
 def find_bullish_divergence(price, rsi, window=50, order=5):
     """
     Detects Bullish Divergence: Price makes a Lower Low, but RSI makes a Higher Low.
@@ -49,6 +54,220 @@ def find_bullish_divergence(price, rsi, window=50, order=5):
             
     return False
 
+def divergence_history(price, rsi, window=50, order=5):
+    """
+    Evaluates find_bullish_divergence at every bar, using only the data available at that bar.
+    Reference implementation (one scipy call per bar); see divergence_panel for the fast path.
+    
+    Returns:
+        np.ndarray: Boolean array, True where the rule would have fired.
+    """
+    price = pd.Series(price).reset_index(drop=True)
+    rsi = pd.Series(rsi).reset_index(drop=True)
+    fired = np.zeros(len(price), dtype=bool)
+    for t in range(window - 1, len(price)):
+        fired[t] = find_bullish_divergence(price.iloc[t - window + 1:t + 1], rsi.iloc[t - window + 1:t + 1], window, order)
+    return fired
+
+@njit(cache=True)
+def _is_trough_nb(x, i, lo, hi, order):
+    """argrelextrema(np.less, mode='clip') at i, comparing only against x[lo..hi]."""
+    v = x[i]
+    for k in range(1, order + 1):
+        left = i - k if i - k > lo else lo
+        right = i + k if i + k < hi else hi
+        if not (v < x[left] and v < x[right]):
+            return False
+    return True
+
+@njit(cache=True)
+def _last_two_troughs_nb(x, confirmed, head, tail, start, end, order):
+    """Newest two troughs of x[start..end] as (newer, older); -1 where missing."""
+    newer = -1
+    # Right edge of the window (clipped to the newest bar)
+    for i in range(end - 1, end - order, -1):
+        if _is_trough_nb(x, i, start, end, order):
+            if newer < 0:
+                newer = i
+            else:
+                return newer, i
+    # Troughs confirmed with their full neighbourhood
+    for j in range(tail - 1, head - 1, -1):
+        if newer < 0:
+            newer = confirmed[j]
+        else:
+            return newer, confirmed[j]
+    # Left edge of the window (clipped to the oldest bar)
+    for i in range(start + order - 1, start, -1):
+        if _is_trough_nb(x, i, start, end, order):
+            if newer < 0:
+                newer = i
+            else:
+                return newer, i
+    return newer, -1
+
+@njit(cache=True)
+def _divergence_panel_nb(price, rsi, window, order, rsi_ceiling):
+    n, m = price.shape
+    out = np.zeros((m, n), dtype=np.bool_)
+    p = np.empty(n)
+    r = np.empty(n)
+    rows = np.empty(n, dtype=np.int64)
+    p_confirmed = np.empty(n, dtype=np.int64)
+    r_confirmed = np.empty(n, dtype=np.int64)
+
+    for col in range(m):
+        # Each symbol only sees its own bars (rows where it has a price)
+        count = 0
+        for t in range(n):
+            if not np.isnan(price[t, col]):
+                p[count] = price[t, col]
+                r[count] = rsi[t, col]
+                rows[count] = t
+                count += 1
+
+        p_head = p_tail = r_head = r_tail = 0
+        for end in range(count):
+            start = end - window + 1
+            # A trough `order` bars back is confirmed now; nothing later than `end` is read
+            middle = end - order
+            if middle - order >= 0:
+                if _is_trough_nb(p, middle, middle - order, end, order):
+                    p_confirmed[p_tail] = middle
+                    p_tail += 1
+                if _is_trough_nb(r, middle, middle - order, end, order):
+                    r_confirmed[r_tail] = middle
+                    r_tail += 1
+            while p_head < p_tail and p_confirmed[p_head] < start + order:
+                p_head += 1
+            while r_head < r_tail and r_confirmed[r_head] < start + order:
+                r_head += 1
+
+            if end < window - 1:
+                continue
+            newer, older = _last_two_troughs_nb(p, p_confirmed, p_head, p_tail, start, end, order)
+            if older < 0:
+                continue
+            _, r_older = _last_two_troughs_nb(r, r_confirmed, r_head, r_tail, start, end, order)
+            if r_older < 0:
+                continue
+            if p[newer] < p[older] and r[newer] > r[older] and r[newer] < rsi_ceiling:
+                out[col, rows[end]] = True
+    return out.T
+
+def divergence_panel(price, rsi, window=50, order=5, rsi_ceiling=45):
+    """
+    Marks every bar of every symbol where find_bullish_divergence would have fired,
+    using only the bars up to (and including) that one.
+    
+    Args:
+        price (pd.DataFrame): (bars x symbols) closing prices; NaN where a symbol has no bar.
+        rsi (pd.DataFrame): RSI values on the same grid.
+        
+    Returns:
+        pd.DataFrame: Boolean panel (np.ndarray if the inputs were arrays).
+    """
+    if window <= 2 * order:
+        raise ValueError("window must be longer than 2 * order")
+    p = np.asarray(price, dtype=np.float64)
+    r = np.asarray(rsi, dtype=np.float64)
+    is_1d = p.ndim == 1
+    if is_1d:
+        p, r = p[:, None], r[:, None]
+    fired = _divergence_panel_nb(p, r, window, order, rsi_ceiling)
+    if is_1d:
+        fired = fired[:, 0]
+    if isinstance(price, pd.DataFrame):
+        return pd.DataFrame(fired, index=price.index, columns=price.columns)
+    if isinstance(price, pd.Series):
+        return pd.Series(fired, index=price.index, name=price.name)
+    return fired
+
+class DivergenceTracker(StreamingIndicator):
+    """
+    Incremental find_bullish_divergence: same window / order / RSI < 45 rule, O(1) work per bar.
+
+    Troughs whose full order-bar neighbourhood is inside the window never change once confirmed,
+    so they are kept in a queue. Only the order-1 bars at either edge of the window, where
+    argrelextrema clips its comparisons to the window, are re-checked on every bar.
+    """
+
+    def __init__(self, window=50, order=5, rsi_ceiling=45):
+        if window <= 2 * order:
+            raise ValueError("window must be longer than 2 * order")
+        self.window = window
+        self.order = order
+        self.rsi_ceiling = rsi_ceiling
+        self.prices = deque(maxlen=window)
+        self.rsis = deque(maxlen=window)
+        self.price_troughs = deque()  # bar numbers of confirmed interior troughs
+        self.rsi_troughs = deque()
+        self.bars = 0
+        self.value = False
+
+    def _is_trough(self, values, i, lo, hi):
+        """argrelextrema(np.less, mode='clip') at bar i, comparing only against bars lo..hi."""
+        offset = self.bars - len(values)
+        x = values[i - offset]
+        for k in range(1, self.order + 1):
+            if not (x < values[max(i - k, lo) - offset] and x < values[min(i + k, hi) - offset]):
+                return False
+        return True
+
+    def _last_two(self, values, confirmed, start, end):
+        """The two most recent troughs inside the window [start, end], newest first."""
+        found = []
+        # Right edge: not enough bars yet after them, compared against the newest bar instead
+        for i in range(end - 1, end - self.order, -1):
+            if self._is_trough(values, i, start, end):
+                found.append(i)
+                if len(found) == 2:
+                    return found
+        for i in reversed(confirmed):
+            found.append(i)
+            if len(found) == 2:
+                return found
+        # Left edge: fewer than `order` bars before them inside the window
+        for i in range(start + self.order - 1, start, -1):
+            if self._is_trough(values, i, start, end):
+                found.append(i)
+                if len(found) == 2:
+                    return found
+        return found
+
+    def update(self, price, rsi):
+        self.prices.append(float(price))
+        self.rsis.append(float(rsi))
+        self.bars += 1
+        end = self.bars - 1
+        start = end - self.window + 1
+
+        # The bar `order` back now has its full neighbourhood on both sides
+        middle = end - self.order
+        if middle - self.order >= 0:
+            if self._is_trough(self.prices, middle, middle - self.order, end):
+                self.price_troughs.append(middle)
+            if self._is_trough(self.rsis, middle, middle - self.order, end):
+                self.rsi_troughs.append(middle)
+        # Troughs that slid into the clipped left edge are re-checked there instead
+        for confirmed in (self.price_troughs, self.rsi_troughs):
+            while confirmed and confirmed[0] < start + self.order:
+                confirmed.popleft()
+
+        self.value = False
+        if self.bars < self.window:
+            return self.value
+        price_lows = self._last_two(self.prices, self.price_troughs, start, end)
+        if len(price_lows) < 2 or len(self._last_two(self.rsis, self.rsi_troughs, start, end)) < 2:
+            return self.value
+
+        offset = self.bars - self.window
+        newer, older = price_lows
+        p_low1, p_low2 = self.prices[older - offset], self.prices[newer - offset]
+        r_low1, r_low2 = self.rsis[older - offset], self.rsis[newer - offset]
+        self.value = bool(p_low2 < p_low1 and r_low2 > r_low1 and r_low2 < self.rsi_ceiling)
+        return self.value
+
 def check_rsi_support_bounce(rsi, threshold=40, tolerance=2):
     """
     Detects if RSI is 'bouncing' off a support level (typically 40 in a bull market).
@@ -68,3 +287,42 @@ def check_rsi_support_bounce(rsi, threshold=40, tolerance=2):
         return True
         
     return False
+
+if __name__ == "__main__":
+    # Parity check: the streaming tracker against the windowed scipy rule, bar by bar
+    import glob
+    import pandas_ta as ta
+
+    rng = np.random.default_rng(7)
+    series = {}
+    for path in sorted(glob.glob("stock-bot/data/*_1Day.csv")):
+        close = pd.read_csv(path, parse_dates=True, index_col=0)['Close']
+        series[path] = (close, ta.rsi(close, length=14))
+    # Coarse random walks produce ties and NaNs, the edge cases of np.less
+    for n in range(20):
+        close = pd.Series(np.round(100 + rng.normal(0, 1, 600).cumsum()))
+        series[f"random walk {n}"] = (close, ta.rsi(close, length=14).round())
+
+    for name, (close, rsi) in series.items():
+        expected = divergence_history(close, rsi)
+        assert np.array_equal(divergence_panel(close.values, rsi.values), expected), f"{name}: panel mismatch"
+        tracker = DivergenceTracker()
+        streamed = []
+        for i, (p, r) in enumerate(zip(close, rsi)):
+            if i == len(close) // 2:
+                tracker = DivergenceTracker().restore(tracker.snapshot())
+            streamed.append(tracker.update(p, r))
+        assert np.array_equal(np.array(streamed), expected), f"{name}: divergence mismatch"
+        print(f"✅ {name}: {int(expected.sum())} divergences, streaming tracker and panel match")
+
+    # Panel throughput: 2,500 symbols x 5 years of daily bars
+    import time
+    close = pd.DataFrame(100 * np.exp(rng.normal(0, 0.02, (1260, 2500)).cumsum(axis=0)))
+    change = close.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, min_periods=14).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / 14, min_periods=14).mean()
+    rsi = 100 * gain / (gain + loss)
+    divergence_panel(close.iloc[:100, :2], rsi.iloc[:100, :2])  # compile
+    start = time.perf_counter()
+    fired = divergence_panel(close, rsi)
+    print(f"⚡ Panel divergence: {close.shape[1]} symbols x {len(close)} bars in {time.perf_counter() - start:.2f}s ({int(fired.values.sum())} signals)")
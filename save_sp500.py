@@ -1,5 +1,7 @@
 import pandas as pd
 import io
+import sync_data
+from universe import create_symbol_tables, store_universe, upsert_symbols
 
 # The raw data we just fetched
 csv_data = """Symbol,Security,GICS Sector,GICS Sub-Industry,Headquarters Location,Date added,CIK,Founded
@@ -470,3 +472,18 @@ with open("stock-bot/data/sp500_tickers.csv", "w") as f:
     f.write("\n".join(tickers))
 
 print(f"Saved {len(tickers)} S&P 500 tickers to stock-bot/data/sp500_tickers.csv")
+
+# Symbol master with the GICS classification, and the SP500 universe bitmap over its ids
+info = pd.DataFrame({
+    'symbol': tickers,
+    'name': df['Security'],
+    'gics_sector': df['GICS Sector'],
+    'gics_sub_industry': df['GICS Sub-Industry'],
+    'date_added': pd.to_datetime(df['Date added'], errors='coerce'),
+    'cik': df['CIK'],
+})
+with sync_data.connect_writer() as conn:
+    create_symbol_tables(conn)
+    added = upsert_symbols(conn, info)
+    store_universe(conn, "SP500", tickers)
+print(f"Stored GICS data for {len(info)} symbols ({added} new) and the SP500 universe in {sync_data.DB_PATH}")
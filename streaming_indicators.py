@@ -0,0 +1,310 @@
+import math
+from collections import deque
+
+import numpy as np
+
+# Incremental (O(1) per bar) versions of the indicators the live engine recomputes every cycle.
+# Each object holds its own accumulators, so feeding one new bar costs the same no matter
+# how much history came before it. Formulas follow pandas_ta, so values line up with the
+# batch calculations (exactly for SMA/MFI/AlphaTrend, to float precision for the Wilder ones).
+
+EPSILON = np.finfo(float).eps
+
+def _field(bar, name):
+    """Reads an OHLCV field from a dict / pandas row (either capitalization) or a bare number."""
+    if isinstance(bar, (int, float, np.floating, np.integer)):
+        return float(bar)
+    try:
+        return float(bar[name])
+    except KeyError:
+        return float(bar[name.lower()])
+
+def _div(a, b):
+    """Division with pandas semantics for zero denominators."""
+    if b == 0 or math.isnan(b):
+        return math.nan if (a == 0 or math.isnan(a) or math.isnan(b)) else math.copysign(math.inf, a)
+    return a / b
+
+class StreamingIndicator:
+    """Base class: snapshot()/restore() round-trip the full state as plain Python data."""
+
+    def snapshot(self):
+        state = {}
+        for key, value in vars(self).items():
+            if isinstance(value, StreamingIndicator):
+                value = value.snapshot()
+            elif isinstance(value, deque):
+                value = list(value)
+            state[key] = value
+        return state
+
+    def restore(self, state):
+        for key, value in state.items():
+            current = getattr(self, key, None)
+            if isinstance(current, StreamingIndicator):
+                current.restore(value)
+            elif isinstance(current, deque):
+                setattr(self, key, deque(value, maxlen=current.maxlen))
+            else:
+                setattr(self, key, value)
+        return self
+
+class _RMA(StreamingIndicator):
+    """
+    pandas_ta's rma: close.ewm(alpha=1/length, min_periods=length).mean().
+    The adjusted EWM is a ratio of two decaying sums, so it can be carried forward exactly.
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.num = 0.0
+        self.den = 0.0
+        self.count = 0
+        self.value = math.nan
+
+    def update(self, x):
+        if math.isnan(x):
+            # Missing observations still age the existing weights (ignore_na=False)
+            self.num *= self.decay
+            self.den *= self.decay
+            return self.value
+        self.num = x + self.decay * self.num
+        self.den = 1.0 + self.decay * self.den
+        self.count += 1
+        self.value = self.num / self.den if self.count >= self.length else math.nan
+        return self.value
+
+class _RollingSum(StreamingIndicator):
+    """Fixed-window sum that is NaN until the window holds `length` valid values."""
+
+    def __init__(self, length):
+        self.length = length
+        self.window = deque(maxlen=length)
+        self.total = 0.0
+        self.nans = 0
+        self.since_resum = 0
+
+    def update(self, x):
+        if len(self.window) == self.length:
+            old = self.window[0]
+            if math.isnan(old):
+                self.nans -= 1
+            else:
+                self.total -= old
+        self.window.append(x)
+        if math.isnan(x):
+            self.nans += 1
+        else:
+            self.total += x
+
+        # Re-sum once per full window so add/subtract rounding never accumulates
+        self.since_resum += 1
+        if self.since_resum >= self.length:
+            self.total = math.fsum(v for v in self.window if not math.isnan(v))
+            self.since_resum = 0
+
+        if len(self.window) < self.length or self.nans:
+            return math.nan
+        return self.total
+
+    def restore(self, state):
+        super().restore(state)
+        self.window = deque(self.window, maxlen=self.length)
+        return self
+
+class RollingSMA(StreamingIndicator):
+    """Simple moving average (df['Close'].rolling(length).mean())."""
+
+    def __init__(self, length=200, source='Close'):
+        self.source = source
+        self.sum = _RollingSum(length)
+        self.value = math.nan
+
+    def update(self, bar):
+        total = self.sum.update(_field(bar, self.source))
+        self.value = total / self.sum.length
+        return self.value
+
+class TrueRange(StreamingIndicator):
+    """ta.true_range: NaN on the first bar, which has no previous close."""
+
+    def __init__(self):
+        self.prev_close = math.nan
+        self.value = math.nan
+
+    def update(self, bar):
+        high, low, close = _field(bar, 'High'), _field(bar, 'Low'), _field(bar, 'Close')
+        if math.isnan(self.prev_close):
+            self.value = math.nan
+        else:
+            high_low = high - low if high != low else EPSILON
+            self.value = max(abs(high_low), abs(high - self.prev_close), abs(self.prev_close - low))
+        self.prev_close = close
+        return self.value
+
+class WilderRSI(StreamingIndicator):
+    """ta.rsi(close, length)."""
+
+    def __init__(self, length=14, source='Close'):
+        self.source = source
+        self.gain = _RMA(length)
+        self.loss = _RMA(length)
+        self.prev = math.nan
+        self.value = math.nan
+
+    def update(self, bar):
+        price = _field(bar, self.source)
+        change = price - self.prev
+        self.prev = price
+        if math.isnan(change):
+            return self.value
+        avg_gain = self.gain.update(max(change, 0.0))
+        avg_loss = self.loss.update(abs(min(change, 0.0)))
+        self.value = 100 * _div(avg_gain, avg_gain + avg_loss)
+        return self.value
+
+class ATR(StreamingIndicator):
+    """ta.atr(high, low, close, length): Wilder-smoothed True Range."""
+
+    def __init__(self, length=14):
+        self.tr = TrueRange()
+        self.rma = _RMA(length)
+        self.value = math.nan
+
+    def update(self, bar):
+        tr = self.tr.update(bar)
+        if not math.isnan(tr) or self.rma.count:
+            self.value = self.rma.update(tr)
+        return self.value
+
+class MFI(StreamingIndicator):
+    """ta.mfi(high, low, close, volume, length)."""
+
+    def __init__(self, length=14):
+        self.pos_flow = _RollingSum(length)
+        self.neg_flow = _RollingSum(length)
+        self.prev_tp = math.nan
+        self.value = math.nan
+
+    def update(self, bar):
+        high, low, close = _field(bar, 'High'), _field(bar, 'Low'), _field(bar, 'Close')
+        typical_price = (high + low + close) / 3
+        raw_money_flow = typical_price * _field(bar, 'Volume')
+        change = typical_price - self.prev_tp
+        self.prev_tp = typical_price
+
+        psum = self.pos_flow.update(raw_money_flow if change > 0 else 0.0)
+        nsum = self.neg_flow.update(raw_money_flow if change < 0 else 0.0)
+        self.value = 100 * _div(psum, psum + nsum)
+        return self.value
+
+class ADX(StreamingIndicator):
+    """ta.adx(high, low, close, length): exposes adx, dmp (+DI) and dmn (-DI)."""
+
+    def __init__(self, length=14, lensig=None):
+        self.tr = TrueRange()
+        self.atr = _RMA(length)
+        self.pos_dm = _RMA(length)
+        self.neg_dm = _RMA(length)
+        self.dx = _RMA(lensig or length)
+        self.prev_high = math.nan
+        self.prev_low = math.nan
+        self.dmp = math.nan
+        self.dmn = math.nan
+        self.value = math.nan
+
+    def update(self, bar):
+        high, low = _field(bar, 'High'), _field(bar, 'Low')
+        tr = self.tr.update(bar)
+        up = high - self.prev_high
+        down = self.prev_low - low
+        self.prev_high, self.prev_low = high, low
+        if math.isnan(tr):
+            return self.value
+
+        pos = up if (up > down and up > 0) else 0.0
+        neg = down if (down > up and down > 0) else 0.0
+        pos = 0.0 if abs(pos) < EPSILON else pos
+        neg = 0.0 if abs(neg) < EPSILON else neg
+
+        k = _div(100, self.atr.update(tr))
+        self.dmp = k * self.pos_dm.update(pos)
+        self.dmn = k * self.neg_dm.update(neg)
+        dx = 100 * _div(abs(self.dmp - self.dmn), self.dmp + self.dmn)
+        if not math.isnan(dx) or self.dx.count:
+            self.value = self.dx.update(dx)
+        return self.value
+
+class AlphaTrend(StreamingIndicator):
+    """
+    Streaming counterpart of indicators.calculate_alphatrend.
+    Exposes k1, k2 (k1 two bars back), and the at_buy / at_sell crossover flags.
+    """
+
+    def __init__(self, period=14, coeff=1):
+        self.coeff = coeff
+        self.tr = TrueRange()
+        self.atr = _RollingSum(period)
+        self.mfi = MFI(period)
+        self.history = deque(maxlen=3)
+        self.k1 = math.nan
+        self.k2 = math.nan
+        self.buy = False
+        self.sell = False
+
+    def update(self, bar):
+        high, low = _field(bar, 'High'), _field(bar, 'Low')
+        atr = self.atr.update(self.tr.update(bar)) / self.atr.length
+        mfi = self.mfi.update(bar)
+
+        prev_k1, prev_k2 = self.k1, self.k2
+        if not self.history:
+            k1 = 0.0
+        elif mfi >= 50:
+            # Uptrend logic: Trailing stop that can only move up
+            upt = low - atr * self.coeff
+            k1 = prev_k1 if upt < prev_k1 else upt
+        else:
+            # Downtrend logic: Trailing stop that can only move down
+            down_t = high + atr * self.coeff
+            k1 = prev_k1 if down_t > prev_k1 else down_t
+
+        self.history.append(k1)
+        self.k1 = k1
+        self.k2 = self.history[0] if len(self.history) == 3 else math.nan
+        self.buy = self.k1 > self.k2 and prev_k1 <= prev_k2
+        self.sell = self.k1 < self.k2 and prev_k1 >= prev_k2
+        return self.k1
+
+if __name__ == "__main__":
+    # Parity check against the batch (pandas_ta) calculations on local data
+    import glob
+    import pandas as pd
+    import pandas_ta as ta
+    from indicators import calculate_alphatrend
+
+    for path in sorted(glob.glob("stock-bot/data/*_1Day.csv")):
+        df = pd.read_csv(path, parse_dates=True, index_col=0)
+        batch = {
+            'sma200': df['Close'].rolling(200).mean(),
+            'rsi': ta.rsi(df['Close'], length=14),
+            'atr': ta.atr(df['High'], df['Low'], df['Close'], length=14),
+            'mfi': ta.mfi(df['High'], df['Low'], df['Close'], df['Volume'], length=14),
+            'adx': ta.adx(df['High'], df['Low'], df['Close'], length=14)['ADX_14'],
+            'at_k1': calculate_alphatrend(df)['At_k1'],
+        }
+        live = {'sma200': RollingSMA(200), 'rsi': WilderRSI(14), 'atr': ATR(14), 'mfi': MFI(14), 'adx': ADX(14), 'at_k1': AlphaTrend()}
+        streamed = {name: [] for name in live}
+        for i, (_, bar) in enumerate(df.iterrows()):
+            # Exercise persistence mid-stream
+            if i == len(df) // 2:
+                live = {name: type(ind)().restore(ind.snapshot()) for name, ind in live.items()}
+            for name, ind in live.items():
+                streamed[name].append(ind.update(bar))
+
+        warmup = 100
+        for name, values in streamed.items():
+            expected = batch[name].to_numpy()[warmup:]
+            assert np.allclose(np.array(values)[warmup:], expected, equal_nan=True), f"{path}: {name} mismatch"
+        print(f"✅ {path}: streaming indicators match batch values")
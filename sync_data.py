@@ -1,107 +1,903 @@
 import duckdb
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import fcntl
 import os
+import queue
+import random
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from alpaca.common.exceptions import APIError
 from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from features import create_feature_tables, drop_features, update_features
+from requests.exceptions import ConnectionError, Timeout
+from universe import create_symbol_tables, universe_symbols
 import time
 
 # --- CONFIG ---
 DB_PATH = "stock-bot/data/market_data.duckdb"
 WATCHLIST_PATH = "stock-bot/data/watchlist_expanded.csv"
+HOURLY_TABLE = "bars_1h"
+# Roll-ups derived from the hourly table. time_bucket starts 4H buckets at midnight (UTC),
+# matching pandas resample('4h'), and weeks on Monday.
+ROLLUPS = {"bars_4h": "4 hours", "bars_1w": "1 week"}
+RATE_LIMIT_PER_MIN = 200  # Alpaca's basic data API quota
+MAX_IN_FLIGHT = 4
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Statuses a bad symbol gets the whole multi-symbol request rejected with; such batches are bisected
+BISECT_STATUSES = {400, 422}
+# How long a quarantined symbol is skipped before it is tried again
+QUARANTINE_RECHECK = timedelta(days=7)
+# Relative close difference on a re-fetched bar that means the history was re-adjusted (split / dividend)
+ADJUSTMENT_TOLERANCE = 2e-4
+# A re-adjustment moves every settled bar by the same ratio: at least this many overlapping bars must have
+# moved, by ratios agreeing to within price rounding, before a symbol's history is re-based
+ADJUSTMENT_CONFIRM_BARS = 3
+ADJUSTMENT_RATIO_SPREAD = 2e-3
+# Spacing between consecutive bars that counts as missing data (a holiday long weekend is 4 days)
+GAP_THRESHOLD = "4 days"
+TIMEFRAMES = {"bars": "1Day", HOURLY_TABLE: "1Hour"}
+# How far before its last stored bar each symbol's request starts, so several settled bars are re-fetched
+# (a week of sessions; four days of hours reaches back over a weekend)
+OVERLAP = {"bars": timedelta(days=7), HOURLY_TABLE: timedelta(days=4)}
+# Tables whose merges also extend the materialized `features` (see features.py)
+FEATURE_TABLES = ("bars",)
 load_dotenv("stock-bot/.env")
 
-client = StockHistoricalDataClient(os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY"))
+# Raw JSON responses go straight into Arrow columns, skipping the per-bar models and the pandas frame.
+# Created on the first fetch, so the warehouse helpers can be imported without Alpaca credentials.
+client = None
 
-def init_db():
+def _client():
+    global client
+    if client is None:
+        client = StockHistoricalDataClient(os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY"), raw_data=True)
+    return client
+
+# --- WAREHOUSE ACCESS ---
+# One writer process at a time works on DB_PATH; everything else reads a published read-only copy.
+# DuckDB locks the file for a read-write connection, so readers of DB_PATH itself would fail (or block
+# ingest) while a sync runs. Writer processes queue on a lock file instead, and when the outermost
+# writer session ends the checkpointed file is copied and swapped in with os.replace: readers keep the
+# snapshot they opened, and the next connect_reader() sees the new one.
+_writer_guard = threading.Lock()
+_writer = {'depth': 0, 'lock_file': None, 'dirty': False}
+
+def snapshot_path():
+    return os.path.splitext(DB_PATH)[0] + ".snapshot.duckdb"
+
+def publish_snapshot():
+    """Checkpoints DB_PATH and atomically replaces the reader snapshot with a copy of it."""
     conn = duckdb.connect(DB_PATH)
+    conn.execute("CHECKPOINT")
+    conn.close()
+    tmp = f"{snapshot_path()}.{os.getpid()}.tmp"
+    shutil.copyfile(DB_PATH, tmp)
+    os.replace(tmp, snapshot_path())
+
+def _lock_file(blocking):
+    lock_file = open(DB_PATH + ".lock", "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+    _writer['lock_file'] = lock_file
+    return True
+
+@contextmanager
+def writer_lock(blocking=True):
+    """
+    Holds the warehouse writer lock for this process. Re-entrant and shared by the process's threads
+    (DuckDB serializes connections within a process); other processes wait here. Publishes the snapshot on the outermost release.
+    With blocking=False it yields False instead of waiting when another process is writing, and True once held.
+    """
+    with _writer_guard:
+        acquired = _writer['depth'] > 0 or _lock_file(blocking)
+        if acquired:
+            _writer['depth'] += 1
+    if not acquired:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        with _writer_guard:
+            _writer['depth'] -= 1
+            if _writer['depth'] == 0:
+                try:
+                    if _writer['dirty']:
+                        publish_snapshot()
+                finally:
+                    _writer['dirty'] = False
+                    _writer['lock_file'].close()
+
+def _file_state():
+    """(size, mtime) of DB_PATH and its WAL; unchanged across a session means nothing was written."""
+    state = []
+    for path in (DB_PATH, DB_PATH + ".wal"):
+        try:
+            stat = os.stat(path)
+            state.append((stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            state.append(None)
+    return state
+
+@contextmanager
+def connect_writer():
+    """
+    A read-write connection to DB_PATH, inside writer_lock(). The snapshot is only republished if the
+    database file changed during the session, so a no-op init_db() costs no checkpoint and copy.
+    """
+    with writer_lock():
+        before = _file_state()
+        conn = duckdb.connect(DB_PATH)
+        try:
+            yield conn
+        finally:
+            conn.close()
+            if _file_state() != before:
+                _writer['dirty'] = True
+
+def connect_reader():
+    """
+    A read-only connection to the latest published snapshot; never blocks or is blocked by a sync.
+    Before the first publish, a reader that finds no writer at work creates and publishes the warehouse;
+    one that finds a writer busy gets an empty in-memory warehouse instead of waiting for it.
+    """
+    if not os.path.exists(snapshot_path()):
+        with writer_lock(blocking=False) as locked:
+            if locked and not os.path.exists(snapshot_path()):
+                init_db()
+                publish_snapshot()
+        if not os.path.exists(snapshot_path()):
+            conn = duckdb.connect(":memory:")
+            _create_schema(conn)
+            return conn
+    return duckdb.connect(snapshot_path(), read_only=True)
+
+def init_db():
+    with connect_writer() as conn:
+        _create_schema(conn)
+
+def _create_schema(conn):
+    for table in ("bars", HOURLY_TABLE):
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                symbol VARCHAR,
+                timestamp TIMESTAMP,
+                open DOUBLE,
+                high DOUBLE,
+                low DOUBLE,
+                close DOUBLE,
+                volume DOUBLE,
+                trade_count DOUBLE,
+                vwap DOUBLE,
+                PRIMARY KEY (symbol, timestamp)
+            )
+        """)
+    # Ranges already requested from the API per table, as separate intervals per symbol, so empty stretches
+    # (pre-IPO history, weekends) are not asked for again by market_data.MarketDataRepository
+    if conn.execute("""
+        SELECT 1 FROM duckdb_constraints() WHERE table_name = 'fetched_ranges' AND constraint_type = 'PRIMARY KEY'
+    """).fetchone():
+        # Older warehouses kept one (min, max) span per symbol, which can hide a hole; re-asking once is cheap
+        conn.execute("DROP TABLE fetched_ranges")
     conn.execute("""
-        CREATE TABLE IF NOT EXISTS bars (
+        CREATE TABLE IF NOT EXISTS fetched_ranges (
+            table_name VARCHAR,
             symbol VARCHAR,
-            timestamp TIMESTAMP,
-            open DOUBLE,
-            high DOUBLE,
-            low DOUBLE,
-            close DOUBLE,
-            volume DOUBLE,
-            trade_count DOUBLE,
-            vwap DOUBLE,
-            PRIMARY KEY (symbol, timestamp)
+            covered_from TIMESTAMPTZ,
+            covered_to TIMESTAMPTZ
         )
     """)
-    conn.close()
+    # What each table holds per symbol, maintained by every merge so nothing has to scan the bars
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS coverage (
+            symbol VARCHAR,
+            timeframe VARCHAR,
+            first_ts TIMESTAMP,
+            last_ts TIMESTAMP,
+            n_rows BIGINT,
+            gaps STRUCT(from_ts TIMESTAMP, to_ts TIMESTAMP)[],
+            last_synced_at TIMESTAMPTZ,
+            PRIMARY KEY (symbol, timeframe)
+        )
+    """)
+    for table, timeframe in TIMEFRAMES.items():
+        if not conn.execute("SELECT 1 FROM coverage WHERE timeframe = ? LIMIT 1", [timeframe]).fetchone():
+            rebuild_coverage(conn, table)
+    create_feature_tables(conn)
+    for table in FEATURE_TABLES:
+        if not conn.execute("SELECT 1 FROM feature_state WHERE timeframe = ? LIMIT 1", [TIMEFRAMES[table]]).fetchone():
+            # One-off back-fill for an existing warehouse; merges keep it current from here on
+            update_features(conn, table, TIMEFRAMES[table], new_rows=table)
+    # Symbols whose stored history was rewritten after a split / dividend re-adjustment
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS adjustment_rebases (
+            table_name VARCHAR,
+            symbol VARCHAR,
+            ratio DOUBLE,
+            rebased_at TIMESTAMPTZ
+        )
+    """)
+    # Symbols the API rejected outright (delisted, futures roots, 'BF-B' spellings); skipped until re-checked
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS quarantine (
+            symbol VARCHAR PRIMARY KEY,
+            error VARCHAR,
+            quarantined_at TIMESTAMPTZ,
+            last_checked_at TIMESTAMPTZ,
+            failures INTEGER
+        )
+    """)
+    # Symbol master (ids, GICS) and index membership bitmaps over its ids, see universe.py
+    create_symbol_tables(conn)
+    for table in ROLLUPS:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                symbol VARCHAR,
+                timestamp TIMESTAMP,
+                open DOUBLE,
+                high DOUBLE,
+                low DOUBLE,
+                close DOUBLE,
+                volume DOUBLE,
+                PRIMARY KEY (symbol, timestamp)
+            )
+        """)
 
-def get_last_dates():
-    if not os.path.exists(DB_PATH):
-        return {}
-    conn = duckdb.connect(DB_PATH)
-    res = conn.execute("SELECT symbol, MAX(timestamp) FROM bars GROUP BY symbol").fetchall()
-    conn.close()
+def get_last_dates(table="bars", conn=None):
+    """{symbol: last stored bar} from the coverage index, read from the published snapshot unless a connection is given."""
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_reader()
+    res = conn.execute("SELECT symbol, last_ts FROM coverage WHERE timeframe = ?", [TIMEFRAMES[table]]).fetchall()
+    if own_conn:
+        conn.close()
     return {r[0]: r[1] for r in res}
 
-def sync_market_data():
-    init_db()
-    with open(WATCHLIST_PATH, "r") as f:
-        tickers = [line.strip() for line in f.readlines() if line.strip()]
-    
-    last_dates = get_last_dates()
-    batch_size = 100
-    
-    conn = duckdb.connect(DB_PATH)
-    
-    print(f"🔄 Syncing market data for {len(tickers)} tickers...")
-    
+def rebuild_coverage(conn, table):
+    """Recomputes `table`'s coverage rows from the bars themselves (one full scan; for existing warehouses)."""
+    conn.execute("DELETE FROM coverage WHERE timeframe = ?", [TIMEFRAMES[table]])
+    conn.execute(f"""
+        INSERT INTO coverage
+        SELECT
+            symbol, $timeframe, MIN(timestamp), MAX(timestamp), COUNT(*),
+            COALESCE(LIST({{'from_ts': prev, 'to_ts': timestamp}} ORDER BY timestamp)
+                     FILTER (WHERE timestamp - prev > INTERVAL '{GAP_THRESHOLD}'), []),
+            now()
+        FROM (SELECT symbol, timestamp, LAG(timestamp) OVER (PARTITION BY symbol ORDER BY timestamp) AS prev FROM {table})
+        GROUP BY symbol
+    """, {'timeframe': TIMEFRAMES[table]})
+
+def update_coverage(conn, table, new_rows="new_rows", synced="merge_rows"):
+    """
+    Folds freshly inserted rows into `table`'s coverage without touching the stored bars.
+    Only new rows can open a gap: after the old last bar, before the old first bar, or inside a known gap
+    (which they split). Every symbol in `synced` gets its last_synced_at stamped.
+    """
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE coverage_update AS
+        WITH touched AS (
+            SELECT symbol, MIN(timestamp) AS lo, MAX(timestamp) AS hi, COUNT(*) AS n FROM {new_rows} GROUP BY symbol
+        ),
+        old AS (
+            SELECT c.* FROM coverage c JOIN touched USING (symbol) WHERE c.timeframe = $timeframe
+        ),
+        old_gaps AS (
+            SELECT symbol, g.from_ts, g.to_ts FROM (SELECT symbol, UNNEST(gaps) AS g FROM old)
+        ),
+        split AS (
+            SELECT DISTINCT og.* FROM old_gaps og JOIN {new_rows} n
+            ON n.symbol = og.symbol AND n.timestamp > og.from_ts AND n.timestamp < og.to_ts
+        ),
+        anchors AS (
+            SELECT symbol, timestamp AS ts FROM {new_rows}
+            UNION SELECT symbol, first_ts FROM old
+            UNION SELECT symbol, last_ts FROM old
+            UNION SELECT symbol, from_ts FROM split
+            UNION SELECT symbol, to_ts FROM split
+        ),
+        pairs AS (
+            SELECT symbol, LAG(ts) OVER (PARTITION BY symbol ORDER BY ts) AS p, ts AS q FROM anchors
+        ),
+        -- A pair of anchors is a real neighbour pair only where no old bar can sit between them
+        gaps AS (
+            SELECT pr.symbol, pr.p AS from_ts, pr.q AS to_ts FROM pairs pr LEFT JOIN old o USING (symbol)
+            WHERE pr.q - pr.p > INTERVAL '{GAP_THRESHOLD}'
+              AND (o.symbol IS NULL OR pr.p >= o.last_ts OR pr.q <= o.first_ts
+                   OR EXISTS (SELECT 1 FROM split s WHERE s.symbol = pr.symbol AND s.from_ts <= pr.p AND pr.q <= s.to_ts))
+            UNION ALL
+            SELECT og.symbol, og.from_ts, og.to_ts FROM old_gaps og
+            ANTI JOIN split s ON s.symbol = og.symbol AND s.from_ts = og.from_ts
+        ),
+        gap_lists AS (
+            SELECT symbol, LIST({{'from_ts': from_ts, 'to_ts': to_ts}} ORDER BY from_ts) AS gaps FROM gaps GROUP BY symbol
+        )
+        SELECT
+            t.symbol, $timeframe AS timeframe,
+            LEAST(COALESCE(o.first_ts, t.lo), t.lo) AS first_ts,
+            GREATEST(COALESCE(o.last_ts, t.hi), t.hi) AS last_ts,
+            COALESCE(o.n_rows, 0) + t.n AS n_rows,
+            COALESCE(g.gaps, []) AS gaps,
+            now() AS last_synced_at
+        FROM touched t
+        LEFT JOIN old o USING (symbol)
+        LEFT JOIN gap_lists g USING (symbol)
+    """, {'timeframe': TIMEFRAMES[table]})
+    conn.execute("INSERT OR REPLACE INTO coverage SELECT * FROM coverage_update")
+    conn.execute(f"""
+        UPDATE coverage SET last_synced_at = now()
+        WHERE timeframe = $timeframe AND symbol IN (SELECT symbol FROM {synced})
+    """, {'timeframe': TIMEFRAMES[table]})
+    conn.execute("DROP TABLE coverage_update")
+
+def refresh_rollups(conn, changed="changed_symbols"):
+    """
+    Rebuilds only the 4H / weekly buckets touched by newly landed hourly rows.
+    `changed` is a relation of (symbol, since): the earliest new hourly timestamp per symbol.
+    """
+    for table, interval in ROLLUPS.items():
+        conn.execute(f"""
+            DELETE FROM {table} USING {changed} c
+            WHERE {table}.symbol = c.symbol
+              AND {table}.timestamp >= time_bucket(INTERVAL '{interval}', c.since)
+        """)
+        conn.execute(f"""
+            INSERT INTO {table}
+            SELECT
+                h.symbol,
+                time_bucket(INTERVAL '{interval}', h.timestamp) AS bucket,
+                arg_min(h.open, h.timestamp),
+                MAX(h.high),
+                MIN(h.low),
+                arg_max(h.close, h.timestamp),
+                SUM(h.volume)
+            FROM {HOURLY_TABLE} h
+            JOIN {changed} c ON h.symbol = c.symbol
+            WHERE h.timestamp >= time_bucket(INTERVAL '{interval}', c.since)
+            GROUP BY h.symbol, bucket
+        """)
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def fetch_bars(request_params, bucket, max_retries=5, backoff=1.0):
+    """client.get_stock_bars, spending one token per attempt and backing off exponentially on 429 / 5xx."""
+    for attempt in range(max_retries + 1):
+        bucket.acquire()
+        try:
+            return bars_to_arrow(_client().get_stock_bars(request_params))
+        except APIError as e:
+            if e.status_code not in RETRY_STATUSES or attempt == max_retries:
+                raise
+        except (ConnectionError, Timeout):
+            if attempt == max_retries:
+                raise
+        # Full jitter so retrying workers don't stampede the quota together
+        time.sleep(random.uniform(0, backoff * 2 ** attempt))
+
+def _error_text(e):
+    try:
+        return e.message
+    except (ValueError, KeyError, TypeError):
+        return str(e)
+
+def _attempt(symbols, make_request, bucket):
+    """fetch_bars for `symbols`; a 400 / 422 comes back as the APIError instead of being raised."""
+    try:
+        return fetch_bars(make_request(symbols), bucket)
+    except APIError as e:
+        if e.status_code not in BISECT_STATUSES:
+            raise
+        return e
+
+def _named_symbol(e, symbols):
+    """The symbol a rejection names as invalid, if it is one of `symbols`."""
+    error = _error_text(e)
+    named = error.removeprefix("invalid symbol: ") if error.startswith("invalid symbol: ") else None
+    return named if named in symbols else None
+
+def _bisect(symbols, make_request, bucket, rejected, state):
+    result = _attempt(symbols, make_request, bucket)
+    if not isinstance(result, APIError):
+        state['ok'] = True
+        return result
+    return _isolate(symbols, result, make_request, bucket, rejected, state)
+
+def _isolate(symbols, e, make_request, bucket, rejected, state):
+    """
+    Bars for `symbols` after their request was rejected with `e`. state['ok'] records that a request of the
+    batch went through, state['split'] that the batch has been halved before.
+    """
+    # Alpaca names the first bad symbol it meets; dropping it directly saves the halving requests
+    named = _named_symbol(e, symbols)
+    if named:
+        rejected.append((named, _error_text(e)))
+        rest = [s for s in symbols if s != named]
+        return _bisect(rest, make_request, bucket, rejected, state) if rest else BAR_SCHEMA.empty_table()
+    if len(symbols) == 1:
+        # An error naming no symbol only convicts a lone symbol once a request without it went through
+        if not state['ok']:
+            raise e
+        rejected.append((symbols[0], _error_text(e)))
+        return BAR_SCHEMA.empty_table()
+    mid = len(symbols) // 2
+    halves = [symbols[:mid], symbols[mid:]]
+    results = [_attempt(half, make_request, bucket) for half in halves]
+    failed = [isinstance(r, APIError) for r in results]
+    # Both halves of the first split rejected for no named symbol: the request itself is bad (a start date,
+    # say), and halving on would cost up to 2N - 1 requests before saying so
+    if not state['split'] and all(failed) and not any(_named_symbol(r, half) for r, half in zip(results, halves)):
+        raise ValueError(f"bad request, not bad symbols: {_error_text(e)}")
+    state['split'] = True
+    state['ok'] = state['ok'] or not all(failed)
+    return pa.concat_tables([
+        _isolate(half, r, make_request, bucket, rejected, state) if bad else r
+        for half, r, bad in zip(halves, results, failed)
+    ])
+
+def fetch_batch(symbols, make_request, bucket, rejected, rechecking=False):
+    """
+    fetch_bars for a batch of symbols that isolates bad symbols instead of losing the whole batch.
+    make_request(symbols) builds the StockBarsRequest. On a 400 / 422 the batch is split until each
+    offender fails on its own; offenders are appended to `rejected` as (symbol, error) and the other
+    symbols' bars are returned. A symbol is only rejected when the error names it or a request without it
+    went through. A batch whose first split fails in both halves, or where every symbol fails, is a bad
+    request, not bad symbols, and raises; the latter not when `rechecking` quarantined symbols, which may
+    well all be rejected again.
+    """
+    batch_rejected = []
+    bars = _bisect(list(symbols), make_request, bucket, batch_rejected, {'ok': False, 'split': False})
+    if not rechecking and len(symbols) > 1 and len(batch_rejected) == len(symbols):
+        raise ValueError(f"every symbol rejected: {batch_rejected[0][1]}")
+    rejected.extend(batch_rejected)
+    return bars
+
+def screen_quarantined(tickers):
+    """Splits tickers into (to_fetch, rechecks): quarantined symbols are left out until QUARANTINE_RECHECK has passed."""
+    conn = connect_reader()
+    quarantined = dict(conn.execute("""
+        SELECT symbol, last_checked_at < now() - $recheck FROM quarantine WHERE symbol IN (SELECT UNNEST($tickers))
+    """, {'tickers': list(tickers), 'recheck': QUARANTINE_RECHECK}).fetchall())
+    conn.close()
+    if quarantined:
+        skipped = sum(not due for due in quarantined.values())
+        print(f"  🚧 Skipping {skipped} quarantined symbols, re-checking {len(quarantined) - skipped}")
+    return [t for t in tickers if quarantined.get(t, True)], [t for t, due in quarantined.items() if due]
+
+def update_quarantine(rejected, released=()):
+    """Records (symbol, error) rejections and lifts the quarantine of re-checked symbols that fetched cleanly."""
+    with connect_writer() as conn:
+        for symbol, error in rejected:
+            conn.execute("""
+                INSERT INTO quarantine VALUES ($symbol, $error, now(), now(), 1)
+                ON CONFLICT (symbol) DO UPDATE SET
+                    error = excluded.error, last_checked_at = now(), failures = quarantine.failures + 1
+            """, {'symbol': symbol, 'error': error})
+            print(f"  🚫 Quarantined {symbol}: {error}")
+        if released:
+            conn.execute("DELETE FROM quarantine WHERE symbol IN (SELECT UNNEST($symbols))", {'symbols': list(released)})
+            print(f"  ✅ Released {len(released)} symbols from quarantine")
+
+def _expected_bars(start, now, bars_per_day):
+    """Rough bar count for a [start, now] fetch: one session's worth per weekday."""
+    return max(int(np.busday_count(start.date(), now.date())), 0) * bars_per_day
+
+def _naive_batches(tickers, last_dates, now, batch_size, overlap=timedelta(0)):
+    """The old per-batch plan: a whole batch refetches from its oldest watermark (or a year back if any symbol is new)."""
+    batches = []
     for i in range(0, len(tickers), batch_size):
         batch = tickers[i:i + batch_size]
-        
-        # Determine the earliest date we need for this batch
-        # If any ticker is new, we need 1 year. Otherwise, we just need from the last timestamp.
-        min_last_date = None
-        for t in batch:
-            if t not in last_dates:
-                min_last_date = datetime.now() - timedelta(days=365)
-                break
-            if min_last_date is None or last_dates[t] < min_last_date:
-                min_last_date = last_dates[t]
-        
-        # Buffer of 1 day to ensure no gaps
-        start_dt = min_last_date + timedelta(minutes=1) if min_last_date else datetime.now() - timedelta(days=365)
-        
-        if start_dt > datetime.now() - timedelta(hours=1):
-            continue # Already up to date
-            
-        print(f"  Batch {i//batch_size + 1}: Fetching from {start_dt.strftime('%Y-%m-%d')}...")
-        
+        if any(t not in last_dates for t in batch):
+            start_dt = now - timedelta(days=365)
+        else:
+            start_dt = min(last_dates[t] for t in batch) - overlap
+        if start_dt + overlap <= now - timedelta(hours=1):
+            batches.append((batch, start_dt))
+    return batches
+
+def plan_batches(tickers, last_dates, now, bucket=timedelta(days=1), bars_per_day=1, batch_size=100, overlap=timedelta(0)):
+    """
+    Groups symbols by their own watermark so each request only covers what its symbols are missing.
+    Symbols whose last bar falls in the same `bucket` share a request starting `overlap` before the oldest
+    of those bars (re-fetching the stored last bar, which may have been partial, and the settled bars that
+    adjustment breaks are spotted on); new symbols share year-back requests. Returns (batches, planned_rows, naive_rows), the row counts
+    being estimates for this plan and for the old one-watermark-per-100-tickers plan.
+    """
+    default_start = now - timedelta(days=365)
+    starts = {}
+    for t in tickers:
+        if t not in last_dates:
+            starts[t] = default_start
+        elif last_dates[t] <= now - timedelta(hours=1):  # otherwise already up to date
+            starts[t] = last_dates[t] - overlap
+    
+    # Sorted by watermark, so every bucket is one contiguous run
+    ordered = sorted(starts, key=starts.get)
+    batches = []
+    i = 0
+    while i < len(ordered):
+        first = starts[ordered[i]]
+        j = i
+        while j < len(ordered) and j - i < batch_size and starts[ordered[j]] - first < bucket:
+            j += 1
+        batches.append((ordered[i:j], first))
+        i = j
+    
+    planned_rows = sum(len(batch) * _expected_bars(start_dt, now, bars_per_day) for batch, start_dt in batches)
+    naive_rows = sum(len(batch) * _expected_bars(start_dt, now, bars_per_day)
+                     for batch, start_dt in _naive_batches(tickers, last_dates, now, batch_size, overlap))
+    return batches, planned_rows, naive_rows
+
+BAR_SCHEMA = pa.schema([
+    ("symbol", pa.string()),
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.float64()),
+    ("trade_count", pa.float64()),
+    ("vwap", pa.float64()),
+])
+
+BAR_VALUES = ("open", "high", "low", "close", "volume", "trade_count", "vwap")
+
+def bars_to_arrow(raw):
+    """Turns a raw bars response ({symbol: [{"t", "o", "h", "l", "c", "v", "n", "vw"}, ...]}) into an Arrow table."""
+    rows = [(symbol, bar) for symbol, bars in raw.items() for bar in bars]
+    return pa.table([
+        pa.array([symbol for symbol, _ in rows], pa.string()),
+        pa.array([bar["t"] for _, bar in rows], pa.string()).cast(pa.timestamp("us", tz="UTC")),
+        *(pa.array([bar.get(key) for _, bar in rows], pa.float64()) for key in ("o", "h", "l", "c", "v", "n", "vw")),
+    ], schema=BAR_SCHEMA)
+
+def bars_to_frames(bars):
+    """Arrow bars (BAR_SCHEMA) -> {symbol: DataFrame} with capitalized columns, like bars.xs(symbol) from the API."""
+    frames = {}
+    for symbol, df in bars.to_pandas().groupby('symbol', sort=False):
+        df = df.drop(columns='symbol').set_index('timestamp').sort_index()
+        df.columns = [c.capitalize() for c in df.columns]
+        frames[symbol] = df
+    return frames
+
+def create_staging(conn):
+    """(Re)creates the run's key-less staging table with the fetched bars' schema."""
+    conn.register("empty", BAR_SCHEMA.empty_table())
+    conn.execute("CREATE OR REPLACE TEMP TABLE staged_bars AS SELECT * FROM empty")
+    conn.unregister("empty")
+
+def stage_bars(conn, bars):
+    """Appends one fetched Arrow table to the run's key-less staging table."""
+    conn.register("fetched", bars)
+    conn.execute("INSERT INTO staged_bars SELECT * FROM fetched")
+    conn.unregister("fetched")
+
+def _staged_ts(table):
+    """Staged timestamps in the table's storage convention: naive UTC for hourly, the session-timezone cast for daily."""
+    return "timezone('UTC', timestamp)" if table == HOURLY_TABLE else "timestamp::TIMESTAMP"
+
+def find_adjustment_breaks(conn, table):
+    """
+    Compares staged bars with the stored settled bars at the same timestamps. Closes that all moved by the
+    same ratio on at least ADJUSTMENT_CONFIRM_BARS bars mean the API re-adjusted the symbol's history (split
+    or dividend) since it was stored. The last stored bar is left out: it may have been stored while still
+    forming, and merge_staged replaces it instead. Returns {symbol: stored / fetched close ratio}.
+    """
+    rows = conn.execute(f"""
+        SELECT s.symbol, median(t.close / s.close)
+        FROM (SELECT DISTINCT symbol, {_staged_ts(table)} AS ts, close FROM staged_bars) s
+        JOIN coverage c ON c.symbol = s.symbol AND c.timeframe = $timeframe
+        JOIN {table} t ON t.symbol = s.symbol AND t.timestamp = s.ts
+        WHERE s.ts < c.last_ts AND ABS(s.close - t.close) > $tolerance * t.close
+        GROUP BY s.symbol
+        HAVING COUNT(*) >= $confirm AND MAX(t.close / s.close) <= MIN(t.close / s.close) * (1 + $spread)
+    """, {
+        'timeframe': TIMEFRAMES[table],
+        'tolerance': ADJUSTMENT_TOLERANCE,
+        'confirm': ADJUSTMENT_CONFIRM_BARS,
+        'spread': ADJUSTMENT_RATIO_SPREAD,
+    }).fetchall()
+    return dict(rows)
+
+def merge_staged(conn, table, replace=False):
+    """
+    Merges the staged rows into `table` in one transaction: staging is deduplicated on (symbol, timestamp),
+    then anti-joined against the rows already stored, so existing bars are kept (like INSERT OR IGNORE).
+    The exception is each symbol's last stored bar, which may have been partial and is upserted.
+    replace=True instead swaps out the staged symbols' whole history. Coverage and features are updated
+    alongside, and hourly rows also refresh the 4H / weekly roll-ups. Returns the number of new rows.
+    """
+    conn.begin()
+    try:
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE merge_rows AS
+            SELECT symbol, {_staged_ts(table)} AS timestamp, open, high, low, close, volume, trade_count, vwap
+            FROM staged_bars
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY symbol, timestamp) = 1
+        """)
+        if replace:
+            for target in (table, "coverage"):
+                where = "" if target == table else f"timeframe = '{TIMEFRAMES[table]}' AND"
+                conn.execute(f"DELETE FROM {target} WHERE {where} symbol IN (SELECT DISTINCT symbol FROM merge_rows)")
+            if table in FEATURE_TABLES:
+                replaced = [r[0] for r in conn.execute("SELECT DISTINCT symbol FROM merge_rows").fetchall()]
+                drop_features(conn, TIMEFRAMES[table], replaced)
+        # Re-fetched last bars that changed since they were stored (a session / hour still forming back then)
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE refreshed_rows AS
+            SELECT m.* FROM merge_rows m
+            JOIN coverage c ON c.symbol = m.symbol AND c.timeframe = $timeframe AND c.last_ts = m.timestamp
+            JOIN {table} t ON t.symbol = m.symbol AND t.timestamp = m.timestamp
+            WHERE {' OR '.join(f'm.{c} IS DISTINCT FROM t.{c}' for c in BAR_VALUES)}
+        """, {'timeframe': TIMEFRAMES[table]})
+        conn.execute(f"""
+            UPDATE {table} t SET {', '.join(f'{c} = r.{c}' for c in BAR_VALUES)}
+            FROM refreshed_rows r WHERE t.symbol = r.symbol AND t.timestamp = r.timestamp
+        """)
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE new_rows AS
+            SELECT s.* FROM merge_rows s
+            ANTI JOIN {table} t ON t.symbol = s.symbol AND t.timestamp = s.timestamp
+        """)
+        inserted = conn.execute(f"INSERT INTO {table} SELECT * FROM new_rows").fetchone()[0]
+        update_coverage(conn, table)
+        conn.execute("CREATE OR REPLACE TEMP TABLE landed_rows AS SELECT * FROM new_rows UNION ALL SELECT * FROM refreshed_rows")
+        if table in FEATURE_TABLES:
+            update_features(conn, table, TIMEFRAMES[table], new_rows="landed_rows")
+        if table == HOURLY_TABLE:
+            conn.execute("""
+                CREATE OR REPLACE TEMP TABLE changed_symbols AS
+                SELECT symbol, MIN(timestamp) AS since FROM landed_rows GROUP BY symbol
+            """)
+            refresh_rollups(conn)
+        for temp in ("merge_rows", "refreshed_rows", "new_rows", "landed_rows"):
+            conn.execute(f"DROP TABLE {temp}")
+        conn.execute("DELETE FROM staged_bars")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return inserted
+
+def _drain_to_db(table, fetched, stats, failed):
+    """
+    The single DuckDB writer: stages (batch, frame) pairs as the fetch workers hand them over, then merges once.
+    Symbols of staged batches go into stats['staged']. A batch that fails to stage or a failed merge leaves
+    its exception in stats['error'] (the first one wins) for the caller to raise; the other batches are still
+    merged. If the writer itself dies (no connection, no staging table), `failed` is also set, so producers
+    stop waiting on the queue.
+    """
+    try:
+        with connect_writer() as conn:
+            create_staging(conn)
+            while True:
+                item = fetched.get()
+                if item is None:
+                    break
+                batch, bars = item
+                try:
+                    stage_bars(conn, bars)
+                    stats['staged'].update(batch)
+                except Exception as e:
+                    print(f"  ❌ Error staging batch: {e}")
+                    stats.setdefault('error', e)
+            try:
+                stats['breaks'] = find_adjustment_breaks(conn, table)
+                stats['rows'] = merge_staged(conn, table)
+            except Exception as e:
+                print(f"  ❌ Error merging into {table}: {e}")
+                stats.setdefault('error', e)
+    except BaseException as e:
+        stats.setdefault('error', e)
+        failed.set()
+
+def _hand_over(fetched, item, failed, poll=1.0):
+    """Queues an item for the writer; returns False instead of blocking forever once the writer has died."""
+    while not failed.is_set():
         try:
+            fetched.put(item, timeout=poll)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def rebase_history(table, breaks, timeframe, bucket):
+    """
+    Re-fetches the full history of symbols whose adjustment basis changed and swaps it in with one
+    transaction (merge_staged(replace=True)), so readers never see a symbol half on the old basis. Logs each re-based symbol.
+    """
+    symbols = sorted(breaks)
+    with connect_writer() as conn:
+        firsts = dict(conn.execute(f"""
+            SELECT symbol, MIN(timestamp) FROM {table} WHERE symbol IN (SELECT UNNEST($symbols)) GROUP BY symbol
+        """, {'symbols': symbols}).fetchall())
+        create_staging(conn)
+        for i in range(0, len(symbols), 100):
+            batch = symbols[i:i + 100]
             request_params = StockBarsRequest(
                 symbol_or_symbols=batch,
-                timeframe=TimeFrame.Day,
+                timeframe=timeframe,
+                start=min(firsts[s] for s in batch),
+                adjustment='all'
+            )
+            stage_bars(conn, fetch_bars(request_params, bucket))
+        
+        # Only symbols that actually came back are replaced; the rest keep their history until the next sync
+        rebased = [r[0] for r in conn.execute("SELECT DISTINCT symbol FROM staged_bars ORDER BY symbol").fetchall()]
+        rows = merge_staged(conn, table, replace=True)
+        conn.execute("""
+            INSERT INTO adjustment_rebases
+            SELECT $table, symbol, ratio, now() FROM (SELECT UNNEST($symbols) AS symbol, UNNEST($ratios) AS ratio)
+        """, {'table': table, 'symbols': rebased, 'ratios': [breaks[s] for s in rebased]})
+    for symbol in rebased:
+        print(f"  🔁 Re-based {symbol} in {table} (stored/new close ratio {breaks[symbol]:.4f})")
+    return rows
+
+def sync_market_data(timeframe=TimeFrame.Day, table="bars", tickers=None,
+                     max_in_flight=MAX_IN_FLIGHT, rate_per_min=RATE_LIMIT_PER_MIN):
+    # One writer session for the whole run, so readers move to the new snapshot once, after the rebases
+    with writer_lock():
+        _sync_market_data(timeframe, table, tickers, max_in_flight, rate_per_min)
+
+def _sync_market_data(timeframe, table, tickers, max_in_flight, rate_per_min):
+    init_db()
+    if tickers is None:
+        with open(WATCHLIST_PATH, "r") as f:
+            tickers = [line.strip() for line in f.readlines() if line.strip()]
+    
+    tickers, rechecks = screen_quarantined(tickers)
+    
+    # Hourly rows are stored as naive UTC so their buckets line up with the engine's resample('4h')
+    hourly = table == HOURLY_TABLE
+    now = datetime.now(timezone.utc).replace(tzinfo=None) if hourly else datetime.now()
+    # This run holds the writer lock, so it reads the watermarks from DB_PATH itself: an init_db() migration
+    # above is not in the snapshot yet
+    with connect_writer() as conn:
+        last_dates = get_last_dates(table, conn)
+    plan = dict(
+        bucket=timedelta(hours=1) if hourly else timedelta(days=1),
+        bars_per_day=16 if hourly else 1,  # 4am-8pm ET, extended hours included
+        overlap=OVERLAP[table]
+    )
+    # Quarantined symbols due a re-check go in batches of their own: those may be rejected whole
+    batches, planned_rows, naive_rows = plan_batches([t for t in tickers if t not in rechecks], last_dates, now, **plan)
+    recheck_batches = plan_batches(rechecks, last_dates, now, **plan)[0]
+    batches = [(batch, start_dt, False) for batch, start_dt in batches] + [(batch, start_dt, True) for batch, start_dt in recheck_batches]
+    
+    print(f"🔄 Syncing {table} for {len(tickers)} tickers ({len(batches)} batches, {max_in_flight} in flight)...")
+    print(f"  🧮 Planned ~{planned_rows:,} rows vs ~{naive_rows:,} with one watermark per 100 tickers")
+    start_time = time.time()
+    
+    # Several requests in flight under the broker's quota; one thread owns the DuckDB connection
+    bucket = TokenBucket(rate_per_min / 60, capacity=max_in_flight)
+    fetched = queue.Queue(maxsize=max_in_flight * 2)
+    stats = {'rows': 0, 'breaks': {}, 'staged': set()}
+    rejected, fetched_ok = [], set()
+    writer_failed = threading.Event()
+    writer = threading.Thread(target=_drain_to_db, args=(table, fetched, stats, writer_failed))
+    writer.start()
+    
+    def fetch(batch, start_dt, rechecking):
+        def make_request(symbols):
+            return StockBarsRequest(
+                symbol_or_symbols=symbols,
+                timeframe=timeframe,
                 start=start_dt,
                 adjustment='all'
             )
-            bars = client.get_stock_bars(request_params).df
-            
-            if not bars.empty:
-                # Prepare for DuckDB insertion
-                df = bars.reset_index()
-                # DuckDB can register pandas dataframes as tables
-                conn.register("temp_df", df)
-                conn.execute("""
-                    INSERT OR IGNORE INTO bars 
-                    SELECT symbol, timestamp, "open", "high", "low", "close", "volume", "trade_count", "vwap" 
-                    FROM temp_df
-                """)
-                conn.unregister("temp_df")
-                
+        return fetch_batch(batch, make_request, bucket, rejected, rechecking)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            futures = {pool.submit(fetch, *task): (n, task[0], task[1]) for n, task in enumerate(batches, 1)}
+            for future in as_completed(futures):
+                n, batch, start_dt = futures[future]
+                try:
+                    bars = future.result()
+                    print(f"  Batch {n}: {bars.num_rows} bars from {start_dt.strftime('%Y-%m-%d')}")
+                except Exception as e:
+                    print(f"  ❌ Error in batch {n}: {e}")
+                    continue
+                if not bars.num_rows:
+                    # Nothing to store: the request going through is all there is to confirm
+                    fetched_ok.update(batch)
+                elif not _hand_over(fetched, (batch, bars), writer_failed):
+                    # Nothing will store these any more: stop fetching and surface the writer's error
+                    pool.shutdown(cancel_futures=True)
+                    break
+    finally:
+        _hand_over(fetched, None, writer_failed)
+        writer.join()
+    if 'error' in stats:
+        raise stats['error']
+    fetched_ok |= stats['staged']
+    
+    # A re-checked symbol is only released once a request including it went through without rejecting it
+    bad = {symbol for symbol, _ in rejected}
+    released = [s for s in rechecks if s in fetched_ok and s not in bad]
+    if rejected or released:
+        update_quarantine(rejected, released)
+    
+    if stats['breaks']:
+        print(f"  ⚠️ Adjustment breaks in {len(stats['breaks'])} symbols, re-fetching their history...")
+        try:
+            rebase_history(table, stats['breaks'], timeframe, bucket)
         except Exception as e:
-            print(f"  ❌ Error in batch: {e}")
-        
-        time.sleep(0.3)
-        
-    conn.close()
-    print("✅ Market Data Sync Complete.")
+            print(f"  ❌ Error re-basing {table}: {e}")
+    
+    print(f"✅ {table} Sync Complete: {stats['rows']:,} new rows in {time.time() - start_time:.1f}s.")
+
+def sync_hourly_data(tickers=None):
+    """Incremental hourly sync; the 4H and weekly roll-ups are refreshed as rows land."""
+    sync_market_data(TimeFrame.Hour, HOURLY_TABLE, tickers)
+
+def load_bars(symbols, table=HOURLY_TABLE, start=None, end=None, conn=None):
+    """
+    Reads bars from the warehouse as {symbol: DataFrame} with capitalized columns,
+    in the same shape as bars.xs(symbol) from the API (UTC index).
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_reader()
+    # Daily rows were cast in the session timezone, hourly / roll-up rows are naive UTC
+    ts = "timestamp::TIMESTAMPTZ" if table == "bars" else "timezone('UTC', timestamp)"
+    query = f"SELECT * REPLACE ({ts} AS timestamp) FROM {table} WHERE symbol IN (SELECT UNNEST($symbols))"
+    params = {'symbols': list(symbols)}
+    if start is not None:
+        query += f" AND {ts} >= $start"
+        params['start'] = start
+    if end is not None:
+        query += f" AND {ts} <= $end"
+        params['end'] = end
+    df_all = conn.execute(query + " ORDER BY symbol, timestamp", params).df()
+    if own_conn:
+        conn.close()
+    
+    frames = {}
+    for symbol, df in df_all.groupby('symbol', sort=False):
+        df = df.drop(columns='symbol').set_index('timestamp')
+        df.index = df.index.tz_convert('UTC')
+        df.columns = [c.capitalize() for c in df.columns]
+        frames[symbol] = df
+    return frames
+
+def load_universe(*names, sector=None, sub_industry=None):
+    """Symbols in every named universe (SP500, NDX, DJIA, R2000, WEEKLY), optionally within a GICS sector / sub-industry."""
+    conn = connect_reader()
+    try:
+        return universe_symbols(conn, *names, sector=sector, sub_industry=sub_industry)
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
     sync_market_data()
+    sync_hourly_data()
@@ -1,54 +1,124 @@
 import pandas as pd
 import numpy as np
-import pandas_ta as ta
 
-def calculate_trend_quality(df, window=20):
+from indicators import calculate_indicator_bundle
+
+def _linregress_window(y):
     """
-    Calculates Trend Intensity (ADX), Smoothness (R-Squared), and Acceleration (Slope).
+    Least-squares slope and R-Squared of y against bar index, along axis 0.
+    y is (window x symbols); returns one value per column.
     """
-    if len(df) < window + 14:
-        return 0, [], 0, 0, 0
+    window = len(y)
+    x = np.arange(window) - (window - 1) / 2
+    y_dev = y - y.mean(axis=0)
+    sxx = np.sum(x ** 2)
+    sxy = x @ y_dev
+    syy = np.sum(y_dev ** 2, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = sxy / sxx
+        r_squared = sxy ** 2 / (sxx * syy)
+    return slope, r_squared
 
-    # 1. ADX (Intensity)
-    adx_df = ta.adx(df['High'], df['Low'], df['Close'], length=14)
-    adx = adx_df['ADX_14'].iloc[-1]
-    
-    # 2. Linear Regression (Smoothness & Slope)
-    # Using a more robust manual calculation to avoid version-specific pandas_ta issues
-    y = df['Close'].tail(window).values
-    x = np.arange(window)
-    
-    # Linear Regression: y = mx + b
-    # m (slope), b (intercept)
-    m, b = np.polyfit(x, y, 1)
-    
-    # R-Squared
-    y_pred = m * x + b
-    r_squared = 1 - (np.sum((y - y_pred)**2) / np.sum((y - np.mean(y))**2))
-    
-    # Prev Slope (last 5 bars shift)
-    y_prev = df['Close'].iloc[-(window+5):-5].values
-    m_prev, _ = np.polyfit(x, y_prev, 1) if len(y_prev) == window else (m, 0)
-    
+def rolling_linregress(close, window=20, lag=5):
+    """
+    Rolling linear regression (Close vs. bar index) for every bar in O(n) using cumulative sums.
+    close: Series, DataFrame or ndarray (1D bars, or 2D bars x symbols).
+    Returns (slope, r_squared, slope_prev) shaped like the input; slope_prev is the slope `lag` bars earlier.
+    Bars without a full window are NaN, and so is every window that contains a NaN (a symbol not listed
+    yet, or a missing bar); the other windows of that column are unaffected.
+    """
+    values = np.asarray(close, dtype=np.float64)
+    is_1d = values.ndim == 1
+    y = values[:, None] if is_1d else values
+    n = len(y)
+
+    slope = np.full(y.shape, np.nan)
+    r_squared = np.full(y.shape, np.nan)
+    if n >= window:
+        # Offset each column by its first valid price so the running sums stay small; NaNs are summed as
+        # zeros and counted, and any window holding one is masked afterwards
+        missing = np.isnan(y)
+        anchor = y[np.argmax(~missing, axis=0), np.arange(y.shape[1])]
+        y = np.where(missing, 0.0, y - np.nan_to_num(anchor))
+        i = np.arange(n, dtype=np.float64)[:, None]
+        zero = np.zeros((1, y.shape[1]))
+        cum_y = np.vstack([zero, np.cumsum(y, axis=0)])
+        cum_iy = np.vstack([zero, np.cumsum(i * y, axis=0)])
+        cum_yy = np.vstack([zero, np.cumsum(y * y, axis=0)])
+        cum_missing = np.vstack([zero, np.cumsum(missing, axis=0)])
+
+        # Window sums for windows ending at bars window-1 .. n-1
+        sy = cum_y[window:] - cum_y[:-window]
+        siy = cum_iy[window:] - cum_iy[:-window]
+        syy = cum_yy[window:] - cum_yy[:-window]
+        incomplete = cum_missing[window:] - cum_missing[:-window] > 0
+        first = i[:n - window + 1]
+        sxy = siy - first * sy  # x restarts at 0 inside each window
+
+        sx = window * (window - 1) / 2
+        sxx = (window - 1) * window * (2 * window - 1) / 6
+        num = window * sxy - sx * sy
+        den_x = window * sxx - sx ** 2
+        den_y = window * syy - sy ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope[window - 1:] = np.where(incomplete, np.nan, num / den_x)
+            r_squared[window - 1:] = np.where(incomplete, np.nan, num ** 2 / (den_x * den_y))
+
+    slope_prev = np.full(y.shape, np.nan)
+    slope_prev[lag:] = slope[:n - lag]
+
+    out = []
+    for arr in (slope, r_squared, slope_prev):
+        arr = arr[:, 0] if is_1d else arr
+        if isinstance(close, pd.Series):
+            arr = pd.Series(arr, index=close.index, name=close.name)
+        elif isinstance(close, pd.DataFrame):
+            arr = pd.DataFrame(arr, index=close.index, columns=close.columns)
+        out.append(arr)
+    return tuple(out)
+
+def linregress_last(closes, window=20, lag=5):
+    """
+    Batch mode: slope, R-Squared and the `lag`-bars-earlier slope at the last bar of every symbol.
+    closes is a (bars x symbols) array/DataFrame, one NumPy pass for the whole universe.
+    Symbols without window + lag bars of history get NaN.
+    """
+    values = np.asarray(closes, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    m = values.shape[1]
+    slope, r_squared, slope_prev = np.full(m, np.nan), np.full(m, np.nan), np.full(m, np.nan)
+    if len(values) >= window:
+        slope, r_squared = _linregress_window(values[-window:])
+    if len(values) >= window + lag:
+        slope_prev, _ = _linregress_window(values[-(window + lag):-lag])
+
+    if isinstance(closes, pd.DataFrame):
+        return pd.DataFrame({'slope': slope, 'r_squared': r_squared, 'slope_prev': slope_prev}, index=closes.columns)
+    return slope, r_squared, slope_prev
+
+def score_trend_quality(adx, slope, r_squared, slope_prev, price):
+    """
+    Scores Trend Intensity (ADX), Smoothness (R-Squared), and Acceleration (Slope) for one bar.
+    """
     # Normalize slope by price
-    price = df['Close'].iloc[-1]
-    norm_slope = (m / price) * 100
-    accelerating = m > m_prev
-    
+    norm_slope = (slope / price) * 100
+    accelerating = slope > slope_prev
+
     score = 0
     signals = []
-    
+
     if adx > 25:
         score += 2
         signals.append(f"Strong Trend (ADX:{int(adx)})")
-    
+
     if r_squared > 0.7:
         score += 2
         signals.append("High Quality Trend (Smooth)")
     elif r_squared > 0.5:
         score += 1
         signals.append("Decent Trend")
-        
+
     if norm_slope > 0.1:
         if accelerating:
             score += 2
@@ -56,9 +126,47 @@ def calculate_trend_quality(df, window=20):
         else:
             score += 1
             signals.append("Trend Stable")
-            
+
     if norm_slope > 1.5:
         score -= 2
         signals.append("PARABOLIC DANGER")
 
     return score, signals, adx, r_squared, norm_slope
+
+def calculate_trend_quality(df, window=20, adx=None):
+    """
+    Calculates Trend Intensity (ADX), Smoothness (R-Squared), and Acceleration (Slope).
+    adx: last-bar ADX(14) if the caller already has it (indicator bundle / streaming state).
+    """
+    if len(df) < window + 14:
+        return 0, [], 0, 0, 0
+
+    # 1. ADX (Intensity)
+    if adx is None:
+        adx = calculate_indicator_bundle(df)['adx'].iloc[-1]
+
+    # 2. Linear Regression (Smoothness & Slope) over the last window, plus the one 5 bars back
+    slope, r_squared, slope_prev = (v[0] for v in linregress_last(df['Close'].values, window=window, lag=5))
+    if np.isnan(slope_prev):
+        slope_prev = slope
+
+    price = df['Close'].iloc[-1]
+    return score_trend_quality(adx, slope, r_squared, slope_prev, price)
+
+if __name__ == "__main__":
+    # rolling_linregress on a panel with a late listing, a mid-series gap and an all-NaN column vs.
+    # linregress_last on each column's own history, bar by bar
+    rng = np.random.default_rng(7)
+    panel = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (300, 4)), axis=0)), columns=list("ABCD"))
+    panel.iloc[:10, 1] = np.nan   # listed 10 bars late
+    panel.iloc[150, 2] = np.nan   # one missing bar
+    panel.iloc[:, 3] = np.nan     # never traded
+    slope, r_squared, slope_prev = rolling_linregress(panel, window=20, lag=5)
+    for col in panel.columns:
+        for t in range(len(panel)):
+            history = panel[col].values[:t + 1]
+            expected = linregress_last(history, window=20, lag=5)
+            got = (slope[col].iloc[t], r_squared[col].iloc[t], slope_prev[col].iloc[t])
+            assert np.allclose(got, [e[0] for e in expected], equal_nan=True, rtol=1e-6), (col, t, got, expected)
+    print(f"  valid slopes per column: {slope.notna().sum().to_dict()}")
+    print("✅ rolling_linregress matches linregress_last per column, NaNs included.")
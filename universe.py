@@ -0,0 +1,164 @@
+import pandas as pd
+
+# Symbol master and index membership in the warehouse. Every symbol gets a stable integer id in
+# `symbols` (with its GICS sector / sub-industry where known), and each universe is stored as a DuckDB
+# BIT string over those ids: bit i is set when symbol_id i is a member. "R2000 ∩ Semiconductors" is then
+# a bit_and of two bitmaps instead of re-reading and intersecting CSV files.
+# Bitmaps are all kept as wide as the id range (BIT strings of different lengths can't be combined), so
+# adding symbols pads the stored ones with zeros.
+
+UNIVERSES = ("SP500", "NDX", "DJIA", "R2000", "WEEKLY")
+SYMBOL_COLUMNS = ('name', 'gics_sector', 'gics_sub_industry', 'date_added', 'cik')
+
+def create_symbol_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS symbols (
+            symbol_id INTEGER PRIMARY KEY,
+            symbol VARCHAR UNIQUE NOT NULL,
+            name VARCHAR,
+            gics_sector VARCHAR,
+            gics_sub_industry VARCHAR,
+            date_added DATE,
+            cik BIGINT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS universes (
+            name VARCHAR PRIMARY KEY,
+            members BIT,
+            n_members INTEGER,
+            updated_at TIMESTAMPTZ
+        )
+    """)
+
+def _width(conn):
+    return conn.execute("SELECT COALESCE(MAX(symbol_id) + 1, 0) FROM symbols").fetchone()[0]
+
+def upsert_symbols(conn, frame):
+    """
+    Adds the symbols in `frame` (a 'symbol' column plus any of SYMBOL_COLUMNS) that `symbols` doesn't
+    have yet under the next free ids, and fills in known fields for existing ones. Returns the number added.
+    """
+    rows = frame.reindex(columns=['symbol', *SYMBOL_COLUMNS]).drop_duplicates('symbol').astype(object)
+    rows = rows.where(rows.notna(), None)
+    width = _width(conn)
+    conn.register("symbol_rows", rows)
+    typed = """
+        SELECT symbol::VARCHAR AS symbol, name::VARCHAR AS name, gics_sector::VARCHAR AS gics_sector,
+               gics_sub_industry::VARCHAR AS gics_sub_industry, date_added::DATE AS date_added, cik::BIGINT AS cik
+        FROM symbol_rows
+    """
+    added = conn.execute(f"""
+        INSERT INTO symbols
+        SELECT $width - 1 + ROW_NUMBER() OVER (ORDER BY r.symbol), r.*
+        FROM ({typed}) r ANTI JOIN symbols s ON s.symbol = r.symbol
+    """, {'width': width}).fetchone()[0]
+    conn.execute(f"""
+        UPDATE symbols s SET
+            {', '.join(f'{c} = COALESCE(r.{c}, s.{c})' for c in SYMBOL_COLUMNS)}
+        FROM ({typed}) r
+        WHERE r.symbol = s.symbol AND s.symbol_id < $width
+    """, {'width': width})
+    conn.unregister("symbol_rows")
+    if added:
+        conn.execute("""
+            UPDATE universes SET members = (members::VARCHAR || repeat('0', $width - bit_length(members)))::BIT
+            WHERE bit_length(members) < $width
+        """, {'width': _width(conn)})
+    return added
+
+def store_universe(conn, name, symbols):
+    """Replaces universe `name`'s membership with `symbols`, registering any the master doesn't know yet."""
+    if name not in UNIVERSES:
+        raise ValueError(f"Unknown universe {name!r}; expected one of {UNIVERSES}")
+    symbols = sorted(set(symbols))
+    if not symbols:
+        raise ValueError(f"Universe {name} has no symbols")
+    upsert_symbols(conn, pd.DataFrame({'symbol': symbols}))
+    conn.execute("""
+        INSERT OR REPLACE INTO universes
+        SELECT $name, bitstring_agg(symbol_id, 0, $width - 1), COUNT(*), now()
+        FROM symbols WHERE symbol IN (SELECT UNNEST($symbols))
+    """, {'name': name, 'width': _width(conn), 'symbols': symbols})
+
+def universe_symbols(conn, *names, sector=None, sub_industry=None):
+    """
+    Symbols in every one of the named universes (none = all symbols), optionally narrowed to a GICS sector
+    and / or sub-industry, sorted. A universe that hasn't been stored yet has no members.
+    """
+    for name in names:
+        if name not in UNIVERSES:
+            raise ValueError(f"Unknown universe {name!r}; expected one of {UNIVERSES}")
+    # One bitmap per distinct name: a repeated name must not raise the count the mask is checked against
+    names = tuple(dict.fromkeys(names))
+    width = _width(conn)
+    if not width:
+        return []
+    # Every filter becomes a bitmap over the ids; no match gives an all-zero one rather than NULL
+    bitmaps, params = [], {'expected': len(names)}
+    if names:
+        bitmaps.append("SELECT members FROM universes WHERE name IN (SELECT UNNEST($names))")
+        params['names'] = list(names)
+    for column, value in (('gics_sector', sector), ('gics_sub_industry', sub_industry)):
+        if value is not None:
+            bitmaps.append(f"""
+                SELECT COALESCE(bitstring_agg(symbol_id, 0, $width - 1), repeat('0', $width)::BIT) AS members
+                FROM symbols WHERE {column} = ${column}
+            """)
+            params.update({column: value, 'width': width})
+            params['expected'] += 1
+    if params['expected'] == 0:
+        return [r[0] for r in conn.execute("SELECT symbol FROM symbols ORDER BY symbol").fetchall()]
+    return [r[0] for r in conn.execute(f"""
+        WITH mask AS (SELECT bit_and(members) AS members, COUNT(*) AS n FROM ({' UNION ALL '.join(bitmaps)}))
+        SELECT s.symbol FROM symbols s, mask
+        WHERE mask.n = $expected AND get_bit(mask.members, s.symbol_id) = 1
+        ORDER BY s.symbol
+    """, params).fetchall()]
+
+if __name__ == "__main__":
+    # Builds the master and universes in memory from a hand-made membership, then checks the bitmap
+    # answers against plain set intersection (including a universe stored before more symbols arrived)
+    import duckdb
+
+    conn = duckdb.connect(":memory:")
+    create_symbol_tables(conn)
+    info = pd.DataFrame({
+        'symbol': ['AMD', 'NVDA', 'AAPL', 'XOM', 'JPM', 'MSFT'],
+        'gics_sector': ['Information Technology'] * 3 + ['Energy', 'Financials', 'Information Technology'],
+        'gics_sub_industry': ['Semiconductors', 'Semiconductors', 'Technology Hardware, Storage & Peripherals',
+                              'Integrated Oil & Gas', 'Diversified Banks', 'Systems Software'],
+        'date_added': ['2017-03-20', '2001-11-30', '1982-11-30', '1957-03-04', '1975-06-30', '1994-06-01'],
+    })
+    print(f"➕ {upsert_symbols(conn, info)} symbols")
+    membership = {
+        'SP500': {'AMD', 'NVDA', 'AAPL', 'XOM', 'JPM', 'MSFT'},
+        'DJIA': {'AAPL', 'JPM', 'MSFT', 'NVDA'},
+    }
+    for name, members in membership.items():
+        store_universe(conn, name, members)
+    # Small caps arrive later with new ids; the stored SP500 / DJIA bitmaps are widened to match
+    membership['R2000'] = {'AMKR', 'SMTC', 'AEHR', 'CRK'}
+    store_universe(conn, 'R2000', membership['R2000'])
+    upsert_symbols(conn, pd.DataFrame({
+        'symbol': ['AMKR', 'SMTC', 'AEHR', 'CRK'],
+        'gics_sector': ['Information Technology'] * 3 + ['Energy'],
+        'gics_sub_industry': ['Semiconductors'] * 3 + ['Oil & Gas Exploration & Production'],
+    }))
+
+    sectors = dict(conn.execute("SELECT symbol, gics_sub_industry FROM symbols").fetchall())
+    semis = {s for s, sub in sectors.items() if sub == 'Semiconductors'}
+    checks = [
+        (('R2000',), 'Semiconductors', membership['R2000'] & semis),
+        (('SP500', 'DJIA'), None, membership['SP500'] & membership['DJIA']),
+        (('SP500', 'SP500'), None, membership['SP500']),
+        (('SP500', 'DJIA'), 'Semiconductors', membership['SP500'] & membership['DJIA'] & semis),
+        (('NDX',), None, set()),
+        ((), 'Semiconductors', semis),
+    ]
+    for names, sub_industry, expected in checks:
+        got = universe_symbols(conn, *names, sub_industry=sub_industry)
+        assert got == sorted(expected), (names, sub_industry, got)
+        print(f"  {' ∩ '.join(names + ((sub_industry,) if sub_industry else ())) or 'all'}: {got}")
+    print(conn.execute("SELECT name, n_members, bit_length(members) FROM universes ORDER BY name").fetchall())
+    print("✅ Universe bitmaps match set intersection.")